@@ -1,26 +1,148 @@
-from flask import Flask
-from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-import os
+from flask import Flask, request, current_app
+from flask.json.provider import DefaultJSONProvider
+from extensions import db, cors
+from config import Config
+import gzip
 
-app = Flask(__name__)
-CORS(app)
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json provider
+    orjson = None
 
-# Database config
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'data', 'database.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
 
-# DB setup
-db = SQLAlchemy()
-db.init_app(app)
 
-# Register route blueprints
-from routes.project_routes import project_bp
-from routes.coding_routes import coding_bp
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster serialization of large payloads"""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype
+        )
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported content coding from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in current_app.config['COMPRESS_MIMETYPES']
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=4)
+    else:
+        compressed = gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL'])
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def create_app(config=None):
+    """Build and configure an app instance.
+
+    `config` is an optional mapping of overrides applied on top of Config,
+    e.g. {"SQLALCHEMY_DATABASE_URI": "sqlite://"} for tests.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+
+    if orjson is not None and app.config["USE_ORJSON"]:
+        app.json = OrjsonProvider(app)
+
+    cors.init_app(app)
+    db.init_app(app)
+    app.after_request(compress_response)
+
+    # Route modules are imported here, not at module import, so importing
+    # this module (or models) stays cheap
+    from routes.project_routes import project_bp
+    from routes.coding_routes import coding_bp
+    from routes.events import events_bp, EventRelay
+    from routes.autosave import DraftCoalescer
+    from routes.snapshot_routes import snapshot_bp
+    from routes.history import history_bp
+    from routes.results_routes import results_bp
+
+    app.register_blueprint(project_bp)
+    app.register_blueprint(coding_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(snapshot_bp)
+    app.register_blueprint(history_bp)
+    app.register_blueprint(results_bp)
+
+    app.extensions["event_relay"] = EventRelay(app)
+    app.extensions["autosaves"] = DraftCoalescer(app)
+
+    if app.config["AUTO_UPGRADE_SCHEMA"]:
+        from models import upgrade_schema
+        with app.app_context():
+            upgrade_schema()
+
+    return app
+
+
+def __getattr__(name):
+    # `from app import app` (flask run, scripts, tests) builds the default app on first use
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-app.register_blueprint(project_bp)
-app.register_blueprint(coding_bp)
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app = create_app()
+    app.run(debug=app.config["DEBUG"])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for a running backend server.
+
+Hammers the read endpoints the coding UI hits most (project-info and
+video-at-index) from several client threads and reports requests/second
+and latency percentiles.
+
+    python benchmarks/bench_server.py --url http://127.0.0.1:5001 --project test
+"""
+
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit, quote
+
+def run_client(host, port, paths, requests_per_client, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    for i in range(requests_per_client):
+        path = paths[i % len(paths)]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5001")
+    parser.add_argument("--project", default="test")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--videos", type=int, default=50, help="distinct video indexes to cycle through")
+    args = parser.parse_args()
+
+    target = urlsplit(args.url)
+    slug = quote(args.project)
+    paths = [f"/api/project-info?project={slug}"] + [
+        f"/api/video-at-index?project={slug}&index={i}" for i in range(args.videos)
+    ]
+
+    latencies = []
+    errors = []
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(target.hostname, target.port or 80, paths, args.requests, latencies, errors)
+        )
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"requests:   {total} ok, {len(errors)} failed in {elapsed:.2f}s")
+    print(f"throughput: {total / elapsed:.1f} req/s")
+    if total:
+        print(f"latency:    p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p95 {latencies[int(total * 0.95) - 1] * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time, app creation time and first-request latency.
+
+Each sample runs in a fresh interpreter so nothing is cached between runs.
+
+    python benchmarks/bench_startup.py --runs 5 --project test
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE = r"""
+import json, sys, time
+start = time.perf_counter()
+import models
+models_done = time.perf_counter()
+from app import create_app
+import_done = time.perf_counter()
+app = create_app()
+create_done = time.perf_counter()
+response = app.test_client().get("/api/project-info?project=" + sys.argv[1])
+request_done = time.perf_counter()
+print(json.dumps({
+    "import_models": models_done - start,
+    "import_app": import_done - start,
+    "create_app": create_done - import_done,
+    "first_request": request_done - create_done,
+    "status": response.status_code,
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--project", default="test")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", SAMPLE, args.project],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for key in ("import_models", "import_app", "create_app", "first_request"):
+        values = [s[key] * 1000 for s in samples]
+        print(f"{key:14} median {statistics.median(values):7.1f} ms   min {min(values):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,52 @@
 import os
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 class Config:
-    DEBUG = os.environ.get("FLASK_DEBUG", True)
+    DEBUG = env_flag("FLASK_DEBUG", False)
+
+    # Database config
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL", 'sqlite:///' + os.path.join(basedir, 'data', 'database.db')
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Create missing tables/columns when the app is created. Off by default so
+    # creating an app never runs DDL; init_db.py and wsgi.py upgrade explicitly
+    AUTO_UPGRADE_SCHEMA = env_flag("AUTO_UPGRADE_SCHEMA", False)
+
+    # Use orjson for JSON responses when it's installed
+    USE_ORJSON = env_flag("USE_ORJSON", True)
+
+    # Response compression config
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIMETYPES = {
+        'application/json', 'text/csv', 'text/html', 'text/plain', 'application/x-ndjson'
+    }
+
+    # How submitted categories are checked against the codebook: strict, lenient or off
+    CODEBOOK_VALIDATION = os.environ.get("CODEBOOK_VALIDATION", "lenient")
+    # Autosaves for the same (coder, video) within this many seconds are merged
+    # into one write; 0 writes every autosave immediately
+    AUTOSAVE_COALESCE_WINDOW = float(os.environ.get("AUTOSAVE_COALESCE_WINDOW", 1.0))
+    # Per-coder token bucket for save-progress: sustained rate (per second) and burst
+    AUTOSAVE_RATE = float(os.environ.get("AUTOSAVE_RATE", 5))
+    AUTOSAVE_BURST = int(os.environ.get("AUTOSAVE_BURST", 20))
+
+    # Server-Sent Events stream. Events are logged to the database and each
+    # process polls the log every EVENTS_POLL_INTERVAL seconds, keeping
+    # EVENTS_RETENTION seconds of it. Each open stream holds a thread; beyond
+    # EVENTS_MAX_STREAMS per process clients get 503.
+    EVENTS_ENABLED = env_flag("EVENTS_ENABLED", True)
+    EVENTS_MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", 4))
+    EVENTS_POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", 0.5))
+    EVENTS_RETENTION = int(os.environ.get("EVENTS_RETENTION", 300))
+
+    # Revisions kept per (coder, video); older ones are folded into a base state
+    RESULT_HISTORY_LIMIT = int(os.environ.get("RESULT_HISTORY_LIMIT", 200))
@@ -8,13 +8,15 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import create_app
+from extensions import db
 from models import Project, Result
 import random
 from datetime import datetime, timedelta
 
 def create_realistic_test_data():
     """Create test data with realistic category patterns for meaningful correlations."""
+    app = create_app()
     
     # Clear existing data
     with app.app_context():
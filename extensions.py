@@ -0,0 +1,6 @@
+from flask_cors import CORS
+from flask_sqlalchemy import SQLAlchemy
+
+# Created unbound; create_app() attaches them to an app with init_app()
+db = SQLAlchemy()
+cors = CORS()
@@ -0,0 +1,49 @@
+"""Gunicorn settings for the production server (see wsgi.py)"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5001")
+
+# SQLite serializes writes, so a few processes with several threads each
+# scale better than many single-threaded workers contending for the lock.
+#
+# Every worker keeps its own in-memory state: the id caches (routes/cache.py),
+# autosave buffers and rate limits, and its open event streams. A rename or
+# delete only invalidates the cache of the worker that handled it; other
+# workers may resolve the old id for up to ID_CACHE_TTL (60s) on reads, while
+# save-progress and submit confirm ids with the database before writing.
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 9)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+
+# Project events go through a log in the database that every worker polls,
+# so any worker can serve a stream. Each stream holds a thread: keep at least
+# half of them for API requests. Read by config.py, which the app imports
+# after this file is loaded.
+os.environ.setdefault("EVENTS_MAX_STREAMS", str(max(1, threads // 2)))
+
+# Import the app (and warm its caches) once in the master before forking
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = os.environ.get("ACCESS_LOG", "-")
+errorlog = "-"
+
+def post_fork(server, worker):
+    # Never reuse a database connection inherited from the master
+    from wsgi import app
+    from extensions import db
+    with app.app_context():
+        db.engine.dispose()
+
+def worker_exit(server, worker):
+    # Write out autosaves still waiting in this worker's coalescing buffer
+    from wsgi import app
+    app.extensions["autosaves"].stop()
@@ -1,6 +1,9 @@
-from app import app, db
+from app import create_app
+from extensions import db
+
+app = create_app()
 import models
 
 with app.app_context():
-    db.create_all()
+    models.upgrade_schema()
     print("✅ Database initialized")
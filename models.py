@@ -1,4 +1,4 @@
-from app import db
+from extensions import db
 from datetime import datetime
 
 class Project(db.Model):
@@ -6,6 +6,7 @@ class Project(db.Model):
     slug = db.Column(db.String, unique=True, nullable=False)
     name = db.Column(db.String, nullable=False)
     codebook = db.Column(db.Text)
+    codebook_version = db.Column(db.Integer, default=0)     # bumped on every codebook write
     video_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     coders = db.relationship("Coder", backref="project", lazy=True)
@@ -18,6 +19,16 @@ class ProjectFile(db.Model):
     filename = db.Column(db.String, nullable=False)            # internal filename (renamed)
     original_name = db.Column(db.String, nullable=False)       # original uploaded name
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    row_offset = db.Column(db.Integer)                         # global position of the file's first video
+    row_count = db.Column(db.Integer)                           # videos this file added (after de-duplication)
+    checksum = db.Column(db.String)                            # sha256 of the file contents
+    file_size = db.Column(db.Integer)                          # size and mtime when ingested; a match
+    file_mtime_ns = db.Column(db.Integer)                      # means the file needn't be re-hashed
+    skipped_rows = db.Column(db.Text)                          # JSON list of rows that added no video
+
+    __table_args__ = (
+        db.Index("uq_project_file_name", "project_id", "filename", unique=True),
+    )
 
 class Coder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -36,3 +47,80 @@ class Result(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String, default="draft")
     excluded = db.Column(db.Boolean, default=False)
+
+class ResultRevision(db.Model):
+    """Append-only log of changes to a coder's answer for one video.
+
+    `delta` holds only what changed relative to the previous revision; `base`
+    is the full state before this revision and is only set on the oldest
+    revision kept after older ones were pruned.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    coder_id = db.Column(db.Integer, db.ForeignKey('coder.id'), nullable=False)
+    video_id = db.Column(db.String, nullable=False)
+    status = db.Column(db.String)
+    excluded = db.Column(db.Boolean, default=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    delta = db.Column(db.Text, nullable=False)
+    base = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index("ix_result_revision_key", "project_id", "video_id", "coder_id"),
+        db.Index("ix_result_revision_coder", "project_id", "coder_id"),
+    )
+
+class ProjectEvent(db.Model):
+    """Short-lived log of live-update events, shared by every server process.
+
+    Writes add a row in their own transaction; each process polls for ids
+    above the last one it saw and relays them to its open event streams.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String, nullable=False)
+    event = db.Column(db.String, nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # AUTOINCREMENT so ids never go back after old rows are pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# Columns added after the original schema; create_all() won't add them to existing tables
+ADDED_COLUMNS = {
+    "project": {
+        "codebook_version": "INTEGER DEFAULT 0",
+    },
+    "project_file": {
+        "row_offset": "INTEGER",
+        "row_count": "INTEGER",
+        "checksum": "VARCHAR",
+        "file_size": "INTEGER",
+        "file_mtime_ns": "INTEGER",
+        "skipped_rows": "TEXT",
+    },
+}
+
+# Unique indexes added after the original schema: name -> (table, columns)
+ADDED_UNIQUE_INDEXES = {
+    "uq_project_file_name": ("project_file", ("project_id", "filename")),
+}
+
+def upgrade_schema():
+    """Create missing tables and add any missing columns and unique indexes to existing ones"""
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+        for name, (table, columns) in ADDED_UNIQUE_INDEXES.items():
+            if name in {i["name"] for i in inspector.get_indexes(table)}:
+                continue
+            cols = ", ".join(columns)
+            # Drop duplicates registered before the index existed, keeping the first
+            conn.exec_driver_sql(
+                f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {cols})"
+            )
+            conn.exec_driver_sql(f"CREATE UNIQUE INDEX {name} ON {table} ({cols})")
@@ -1,4 +1,7 @@
-from app import app, db
+from app import create_app
+from extensions import db
+
+app = create_app()
 
 with app.app_context():
     db.drop_all()
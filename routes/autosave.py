@@ -0,0 +1,239 @@
+from flask import current_app
+from models import db, Result
+from routes.events import publish_progress
+from routes.history import record_revision, parse_categories, prune_history, history_limit
+from collections import namedtuple
+import threading
+import atexit
+import time
+import json
+
+# One pending autosave. `key` is (project id, coder id, video id).
+Draft = namedtuple("Draft", "slug coder_name categories notes excluded saved_at")
+
+def write_draft(key, draft):
+    """Upsert a draft result and log its revision in the current session; the caller commits.
+
+    Returns False without writing anything if the stored answer is newer
+    than the draft. Drafts can be flushed late, by the background thread or
+    by another worker, after submit or a newer autosave has already written
+    the row, and must not overwrite it. A draft saved after a submit reopens
+    the answer as a draft, as an immediate write would.
+    """
+    project_id, coder_id, video_id = key
+    categories = draft.categories if not draft.excluded else {}
+    values = {
+        "categories": json.dumps(categories),
+        "notes": draft.notes,
+        "excluded": draft.excluded,
+        "timestamp": draft.saved_at,
+        "status": "draft"
+    }
+
+    result = db.session.query(Result.id, Result.categories, Result.notes, Result.excluded).filter_by(
+        project_id=project_id,
+        coder_id=coder_id,
+        video_id=video_id
+    ).first()
+
+    if result:
+        # The condition is part of the UPDATE, so a write committed since the
+        # read above still wins
+        updated = Result.query.filter(
+            Result.id == result.id,
+            db.or_(Result.timestamp.is_(None), Result.timestamp <= draft.saved_at)
+        ).update(values, synchronize_session=False)
+        if not updated:
+            return False
+        previous = (parse_categories(result.categories), result.notes, result.excluded)
+    else:
+        db.session.add(Result(project_id=project_id, coder_id=coder_id, video_id=video_id, **values))
+        previous = ({}, "", False)
+
+    if record_revision(
+        project_id, coder_id, video_id,
+        previous, (categories, draft.notes, draft.excluded),
+        "draft"
+    ):
+        # Coders who only autosave never reach submit's pruning
+        prune_history(project_id, coder_id, video_id, history_limit())
+    return True
+
+def publish_draft(key, draft):
+    publish_progress(draft.slug, draft.coder_name, key[2], "excluded" if draft.excluded else "draft")
+
+class DraftCoalescer:
+    """Buffers autosaves so bursts for the same (coder, video) become one write.
+
+    A draft waits at most `window` seconds; newer drafts for the same key
+    replace it without resetting the clock. A background thread flushes due
+    drafts in a single transaction, submit flushes its own key first, and
+    everything left is flushed at interpreter exit.
+
+    Each app has its own coalescer (in app.extensions), and drafts are
+    always written to that app's database.
+    """
+
+    def __init__(self, app):
+        self._pending = {}  # key -> (first queued at, Draft)
+        self._lock = threading.Lock()
+        self._app = app
+        self._thread = None
+        self._stop = threading.Event()
+        atexit.register(self.flush_all)
+
+    def put(self, key, draft):
+        with self._lock:
+            entry = self._pending.get(key)
+            self._pending[key] = (entry[0] if entry else time.monotonic(), draft)
+        self._ensure_flusher()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._pending.get(key)
+        return entry[1] if entry else None
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._pending.pop(key, None)
+        return entry[1] if entry else None
+
+    def take_due(self, window):
+        """Remove and return drafts that have waited at least `window` seconds"""
+        cutoff = time.monotonic() - window
+        with self._lock:
+            due = [key for key, (queued, _) in self._pending.items() if queued <= cutoff]
+            return [(key, self._pending.pop(key)[1]) for key in due]
+
+    def take_all(self):
+        with self._lock:
+            drafts = [(key, draft) for key, (_, draft) in self._pending.items()]
+            self._pending.clear()
+        return drafts
+
+    def discard_where(self, predicate):
+        """Drop pending drafts whose key matches, e.g. for a deleted coder"""
+        with self._lock:
+            for key in [k for k in self._pending if predicate(k)]:
+                del self._pending[key]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _requeue(self, drafts):
+        # Put back drafts from a failed flush unless a newer one has arrived
+        with self._lock:
+            for key, draft in drafts:
+                self._pending.setdefault(key, (time.monotonic(), draft))
+
+    def flush(self, drafts):
+        """Write drafts, and events for those that were written, in one transaction"""
+        if not drafts:
+            return 0
+        try:
+            written = [(key, draft) for key, draft in drafts if write_draft(key, draft)]
+            for key, draft in written:
+                publish_draft(key, draft)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._requeue(drafts)
+            raise
+        return len(written)
+
+    def flush_all(self):
+        """Flush everything pending; used at shutdown"""
+        drafts = self.take_all()
+        if drafts:
+            with self._app.app_context():
+                self.flush(drafts)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="autosave-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        window = self._app.config["AUTOSAVE_COALESCE_WINDOW"]
+        while not self._stop.wait(max(window / 2, 0.05)):
+            drafts = self.take_due(window)
+            if not drafts:
+                continue
+            with self._app.app_context():
+                try:
+                    self.flush(drafts)
+                except Exception as e:
+                    print(f"Error flushing autosaves: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush_all()
+
+def pending_autosaves():
+    """The current app's DraftCoalescer"""
+    return current_app.extensions["autosaves"]
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Consume a token; return 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class RateLimiter:
+    """Per-key token buckets, e.g. one per coder, kept in process memory"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def check(self, key, rate, capacity):
+        """Return 0 if the request may proceed, otherwise seconds to wait"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.maxsize:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            return bucket.take()
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+autosave_limiter = RateLimiter()
+
+def save_draft(key, draft):
+    """Coalesce a draft, or write it through when coalescing is disabled"""
+    if current_app.config["AUTOSAVE_COALESCE_WINDOW"] > 0:
+        pending_autosaves().put(key, draft)
+        return
+    if write_draft(key, draft):
+        publish_draft(key, draft)
+    db.session.commit()
+
+def flush_pending(key):
+    """Write any buffered draft for this key into the current transaction"""
+    draft = pending_autosaves().pop(key)
+    if draft is not None:
+        write_draft(key, draft)
+    return draft
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from models import db, Project, Coder
+import threading
+import json
+import time
+
+class LRUCache:
+    """Small thread-safe LRU cache with a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Id caches are per process: under several gunicorn workers a rename or delete
+# only invalidates the worker that handled it, so the TTL bounds how long other
+# workers can resolve a stale id. Write paths confirm ids with the database.
+ID_CACHE_TTL = 60
+# slug -> project id
+project_ids = LRUCache(maxsize=256, ttl=ID_CACHE_TTL)
+# (project id, coder name) -> coder id
+coder_ids = LRUCache(maxsize=4096, ttl=ID_CACHE_TTL)
+# project id -> (codebook version, parsed codebook)
+codebooks = LRUCache(maxsize=256, ttl=3600)
+
+def resolve_project_id(slug):
+    """Return the id of the project with this slug, or None"""
+    if not slug:
+        return None
+    project_id = project_ids.get(slug)
+    if project_id is None:
+        project_id = db.session.query(Project.id).filter_by(slug=slug).scalar()
+        if project_id is not None:
+            project_ids.set(slug, project_id)
+    return project_id
+
+def resolve_coder_id(project_id, name):
+    """Return the id of the named coder in a project, or None"""
+    if project_id is None or not name:
+        return None
+    key = (project_id, name)
+    coder_id = coder_ids.get(key)
+    if coder_id is None:
+        coder_id = db.session.query(Coder.id).filter_by(name=name, project_id=project_id).scalar()
+        if coder_id is not None:
+            coder_ids.set(key, coder_id)
+    return coder_id
+
+def resolve_ids_for_write(slug, coder_name):
+    """Resolve (project id, coder id) for a write, confirming cached ids with the database.
+
+    Another worker may have renamed or deleted the coder or project since the
+    ids were cached. A stale entry is dropped and resolved again, so rows are
+    never written for a coder or project that no longer exists.
+    """
+    project_id = resolve_project_id(slug)
+    coder_id = resolve_coder_id(project_id, coder_name)
+    if project_id is None or coder_id is None:
+        return project_id, coder_id
+    current = (
+        db.session.query(Coder.id)
+        .join(Project, Project.id == Coder.project_id)
+        .filter(Coder.id == coder_id, Coder.name == coder_name, Project.id == project_id, Project.slug == slug)
+        .scalar()
+    )
+    if current is None:
+        project_ids.pop(slug)
+        coder_ids.pop((project_id, coder_name))
+        project_id = resolve_project_id(slug)
+        coder_id = resolve_coder_id(project_id, coder_name)
+    return project_id, coder_id
+
+def get_project(slug):
+    """Load a project by slug, resolving the id through the cache"""
+    project_id = resolve_project_id(slug)
+    project = db.session.get(Project, project_id) if project_id is not None else None
+    if project_id is not None and (project is None or project.slug != slug):
+        # Stale entry (deleted or renamed elsewhere); look the slug up again
+        project_ids.pop(slug)
+        project_id = resolve_project_id(slug)
+        project = db.session.get(Project, project_id) if project_id is not None else None
+    return project
+
+def get_coder(project_id, name):
+    """Load a coder by project id and name, resolving the id through the cache"""
+    coder_id = resolve_coder_id(project_id, name)
+    coder = db.session.get(Coder, coder_id) if coder_id is not None else None
+    if coder_id is not None and (coder is None or coder.name != name or coder.project_id != project_id):
+        coder_ids.pop((project_id, name))
+        coder_id = resolve_coder_id(project_id, name)
+        coder = db.session.get(Coder, coder_id) if coder_id is not None else None
+    return coder
+
+def get_codebook(project):
+    """Return the project's parsed codebook, reusing it until the version changes.
+
+    The returned list is shared; copy it before modifying.
+    """
+    version = project.codebook_version or 0
+    cached = codebooks.get(project.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    try:
+        codebook = json.loads(project.codebook or "[]")
+    except json.JSONDecodeError:
+        codebook = []
+    codebooks.set(project.id, (version, codebook))
+    return codebook
+
+def invalidate_project(slug, project_id=None):
+    project_ids.pop(slug)
+    if project_id is not None:
+        coder_ids.pop_where(lambda key: key[0] == project_id)
+        codebooks.pop(project_id)
+
+def invalidate_coder(project_id, name):
+    coder_ids.pop((project_id, name))
+
+def cache_stats():
+    return {
+        "projects": project_ids.stats(),
+        "coders": coder_ids.stats(),
+        "codebooks": codebooks.stats()
+    }
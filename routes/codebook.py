@@ -0,0 +1,246 @@
+from models import db, Project, Result
+from routes.cache import LRUCache, get_codebook, codebooks
+from sqlalchemy import update
+from types import MappingProxyType
+import copy
+import json
+
+# Strictest first
+VALIDATION_MODES = ("strict", "lenient", "off")
+
+# project id -> (codebook version, compiled codebook)
+compiled_codebooks = LRUCache(maxsize=256, ttl=3600)
+
+class CodebookError(ValueError):
+    pass
+
+class CodebookConflict(Exception):
+    """The codebook was changed by someone else since the expected version"""
+
+    def __init__(self, current_version):
+        super().__init__(f"Codebook is at version {current_version}")
+        self.current_version = current_version
+
+def tag_name(tag):
+    return tag if isinstance(tag, str) else tag.get("tag", "")
+
+def _find_category(codebook, name):
+    return next((c for c in codebook if c.get("category") == name), None)
+
+def _find_tag(category, name):
+    return next((i for i, t in enumerate(category.get("tags", [])) if tag_name(t) == name), None)
+
+def apply_codebook_operations(codebook, operations):
+    """Apply add/rename/remove operations to a copy of a codebook.
+
+    Returns (new_codebook, changes), where changes lists the renames and
+    removals that existing results need to follow. Raises CodebookError
+    naming the first invalid operation.
+    """
+    codebook = copy.deepcopy(codebook)
+    changes = []
+
+    for i, op in enumerate(operations):
+        if not isinstance(op, dict):
+            raise CodebookError(f"Operation {i}: must be an object")
+        kind = op.get("op")
+        category = op.get("category")
+        tag = op.get("tag")
+        if not category:
+            raise CodebookError(f"Operation {i}: missing category")
+        existing = _find_category(codebook, category)
+
+        if kind == "add":
+            if not existing:
+                existing = {"category": category, "tags": []}
+                if op.get("description"):
+                    existing["description"] = op["description"]
+                codebook.append(existing)
+            if tag and _find_tag(existing, tag) is None:
+                existing.setdefault("tags", []).append(
+                    {"tag": tag, "description": op["description"]} if op.get("description") else tag
+                )
+
+        elif kind == "rename":
+            new_name = op.get("new_name")
+            if not new_name:
+                raise CodebookError(f"Operation {i}: missing new_name")
+            if not existing:
+                raise CodebookError(f"Operation {i}: unknown category '{category}'")
+            if tag:
+                index = _find_tag(existing, tag)
+                if index is None:
+                    raise CodebookError(f"Operation {i}: unknown tag '{tag}' in '{category}'")
+                if _find_tag(existing, new_name) is not None:
+                    raise CodebookError(f"Operation {i}: tag '{new_name}' already exists in '{category}'")
+                old = existing["tags"][index]
+                existing["tags"][index] = new_name if isinstance(old, str) else {**old, "tag": new_name}
+            else:
+                if _find_category(codebook, new_name):
+                    raise CodebookError(f"Operation {i}: category '{new_name}' already exists")
+                existing["category"] = new_name
+            changes.append(("rename", category, tag, new_name))
+
+        elif kind == "remove":
+            if not existing:
+                raise CodebookError(f"Operation {i}: unknown category '{category}'")
+            if tag:
+                index = _find_tag(existing, tag)
+                if index is None:
+                    raise CodebookError(f"Operation {i}: unknown tag '{tag}' in '{category}'")
+                del existing["tags"][index]
+            else:
+                codebook.remove(existing)
+            changes.append(("remove", category, tag, None))
+
+        else:
+            raise CodebookError(f"Operation {i}: unknown op '{kind}'")
+
+    return codebook, changes
+
+def apply_changes_to_categories(categories, changes):
+    """Replay codebook renames/removals on one result's categories dict"""
+    for kind, category, tag, new_name in changes:
+        if category not in categories:
+            continue
+        if kind == "rename" and tag is None:
+            categories[new_name] = categories.pop(category)
+        elif kind == "rename":
+            categories[category] = [new_name if t == tag else t for t in categories[category]]
+        elif tag is None:
+            del categories[category]
+        else:
+            categories[category] = [t for t in categories[category] if t != tag]
+    return categories
+
+def update_results_for_changes(project_id, changes, batch_size=1000):
+    """Rewrite stored results so they follow renamed and removed categories/tags"""
+    if not changes:
+        return 0
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Result.id, Result.categories)
+            .filter(Result.project_id == project_id, Result.id > last_id)
+            .order_by(Result.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        batch = []
+        for result_id, raw in rows:
+            if not raw:
+                continue
+            try:
+                categories = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            new_raw = json.dumps(apply_changes_to_categories(categories, changes))
+            if new_raw != raw:
+                batch.append({"id": result_id, "categories": new_raw})
+        if batch:
+            db.session.execute(update(Result), batch)
+            updated += len(batch)
+        last_id = rows[-1][0]
+    return updated
+
+def write_codebook(project, codebook, expected_version=None):
+    """Store a new codebook and bump its version in the current transaction.
+
+    The UPDATE is conditional on the version still being expected_version
+    (the version that was read, if not given), so concurrent writers can't
+    silently overwrite each other. Raises CodebookConflict otherwise.
+    Returns the new version; the caller commits.
+    """
+    if expected_version is None:
+        expected_version = project.codebook_version or 0
+    new_version = expected_version + 1
+    version_filter = (
+        Project.codebook_version == expected_version
+        if expected_version else
+        db.or_(Project.codebook_version == 0, Project.codebook_version.is_(None))
+    )
+    updated = (
+        Project.query
+        .filter(Project.id == project.id, version_filter)
+        .update(
+            {Project.codebook: json.dumps(codebook), Project.codebook_version: new_version},
+            synchronize_session=False
+        )
+    )
+    if not updated:
+        db.session.rollback()
+        current = db.session.query(Project.codebook_version).filter_by(id=project.id).scalar()
+        raise CodebookConflict(current or 0)
+    # Keep the loaded instance in step with the row we just wrote
+    db.session.expire(project, ["codebook", "codebook_version"])
+    codebooks.pop(project.id)
+    compiled_codebooks.pop(project.id)
+    return new_version
+
+def compile_codebook(codebook):
+    """Freeze a codebook into a read-only {category: frozenset(tags)} lookup"""
+    return MappingProxyType({
+        cat.get("category", ""): frozenset(tag_name(t) for t in cat.get("tags", []))
+        for cat in codebook
+    })
+
+def get_compiled_codebook(project_id):
+    """Return the compiled codebook for a project, recompiling only when its version changes"""
+    version = db.session.query(Project.codebook_version).filter_by(id=project_id).scalar() or 0
+    cached = compiled_codebooks.get(project_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    compiled = compile_codebook(get_codebook(db.session.get(Project, project_id)))
+    compiled_codebooks.set(project_id, (version, compiled))
+    return compiled
+
+def validate_categories(compiled, categories):
+    """Check submitted categories against a compiled codebook.
+
+    Returns (clean, errors): clean keeps only known categories and tags
+    (duplicates removed, order preserved) and errors describes everything
+    that was dropped. Runs in O(number of submitted tags).
+    """
+    if not isinstance(categories, dict):
+        return {}, ["categories must be an object"]
+
+    clean = {}
+    errors = []
+    for category, tags in categories.items():
+        allowed = compiled.get(category)
+        if allowed is None:
+            errors.append(f"Unknown category '{category}'")
+            continue
+        if isinstance(tags, str):
+            tags = [tags]
+        elif not isinstance(tags, list):
+            errors.append(f"Tags for '{category}' must be a list")
+            continue
+        kept = []
+        seen = set()
+        for tag in tags:
+            if not isinstance(tag, str) or tag not in allowed:
+                errors.append(f"Unknown tag '{tag}' in '{category}'")
+            elif tag not in seen:
+                kept.append(tag)
+                seen.add(tag)
+        clean[category] = kept
+    return clean, errors
+
+def check_submission(project_id, categories, mode):
+    """Validate categories for a project in the given mode.
+
+    Returns (categories, errors). In strict mode any error means the
+    submission should be rejected; in lenient mode the cleaned categories
+    are stored and the errors are reported back. Projects without a
+    codebook accept anything.
+    """
+    if mode == "off":
+        return categories, []
+    compiled = get_compiled_codebook(project_id)
+    if not compiled:
+        return categories, []
+    return validate_categories(compiled, categories)
@@ -1,28 +1,27 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, Project, Coder, Result, ProjectFile
+from routes.cache import get_project, get_codebook, resolve_coder_id, resolve_ids_for_write
+from routes.codebook import (
+    apply_codebook_operations, update_results_for_changes, write_codebook,
+    check_submission, CodebookError, CodebookConflict, VALIDATION_MODES
+)
+from routes.manifest import video_at
+from routes.events import publish_progress, publish_codebook
+from routes.history import record_revision, parse_categories, prune_history, history_limit
+from routes.autosave import Draft, pending_autosaves, autosave_limiter, save_draft, flush_pending
 from datetime import datetime
 import json
-import os
-import csv
 
 coding_bp = Blueprint('coding', __name__)
 
-def load_video_list(project):
-    folder = os.path.join("uploads", project.slug)
-    videos = []
-    seen = set()
-    if os.path.isdir(folder):
-        for f in os.listdir(folder):
-            path = os.path.join(folder, f)
-            if path.endswith(".csv"):
-                with open(path, newline='', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    for row in reader:
-                        vid = row.get("id") or row.get("video_id")
-                        if vid and vid not in seen:
-                            videos.append(row)
-                            seen.add(vid)
-    return videos
+def validation_mode(data):
+    """Validation mode for a request: CODEBOOK_VALIDATION, or a stricter mode the request asks for"""
+    configured = current_app.config.get("CODEBOOK_VALIDATION", "lenient")
+    requested = data.get("validation") or configured
+    if requested not in VALIDATION_MODES or configured not in VALIDATION_MODES:
+        return None
+    # A request may tighten the server's mode but never loosen it
+    return min(requested, configured, key=VALIDATION_MODES.index)
 
 def extract_metadata(row):
     return {
@@ -48,45 +47,46 @@ def video_at_index():
     coder_name = request.args.get("coder")
     index_param = request.args.get("index")
 
-    project = Project.query.filter_by(slug=slug).first()
+    project = get_project(slug)
     if not project:
         return jsonify({"error": "Project not found"}), 404
 
-    coder = Coder.query.filter_by(name=coder_name, project_id=project.id).first() if coder_name else None
-    if not coder and coder_name:
+    coder_id = resolve_coder_id(project.id, coder_name) if coder_name else None
+    if not coder_id and coder_name:
         return jsonify({"error": "Coder not found"}), 404
 
-    videos = load_video_list(project)
-    total_videos = len(videos)
-
     if index_param is not None:
         try:
             index = int(index_param)
         except ValueError:
             return jsonify({"error": "Invalid index"}), 400
-    elif coder:
-        index = coder.progress_index
+    elif coder_id:
+        index = db.session.query(Coder.progress_index).filter_by(id=coder_id).scalar() or 0
     else:
         index = 0  # fallback if coder is not provided
 
-    if index < 0 or index >= total_videos:
+    row, total_videos = video_at(project, index)
+    if row is None:
         return jsonify({"error": "Index out of range"}), 400
 
-    row = videos[index]
     video_id = row.get("id") or row.get("video_id")
 
     # Fetch existing response if present
     response_data = {}
-    if coder:
+    if coder_id:
         result = Result.query.filter_by(
             project_id=project.id,
-            coder_id=coder.id,
+            coder_id=coder_id,
             video_id=video_id
         ).first()
         response_data = {
             "categories": json.loads(result.categories) if result and result.categories else {},
             "notes": result.notes if result else ""
         }
+        pending = pending_autosaves().get((project.id, coder_id, video_id))
+        if pending is not None:
+            # Show the newest autosave even if it hasn't been flushed yet
+            response_data = {"categories": pending.categories, "notes": pending.notes}
 
     return jsonify({
         "id": video_id,
@@ -114,37 +114,35 @@ def save_progress():
     }
     notes = response.get("notes", "")
 
-    project = Project.query.filter_by(slug=slug).first()
-    coder = Coder.query.filter_by(name=coder_name, project_id=project.id).first()
-    if not project or not coder:
+    project_id, coder_id = resolve_ids_for_write(slug, coder_name)
+    if not project_id or not coder_id:
         return jsonify({"error": "Project or Coder not found"}), 404
 
-    result = Result.query.filter_by(
-        project_id=project.id,
-        coder_id=coder.id,
-        video_id=video_id
-    ).first()
-
-    if not result:
-        result = Result(
-            project_id=project.id,
-            coder_id=coder.id,
-            video_id=video_id,
-            categories=json.dumps(categories) if not excluded else json.dumps({}),
-            notes=notes,
-            status="draft",
-            excluded=excluded,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(result)
-    else:
-        result.categories = json.dumps(categories) if not excluded else json.dumps({})
-        result.notes = notes
-        result.excluded = excluded
-        result.timestamp = datetime.utcnow()
-        result.status = "draft"
-
-    db.session.commit()
+    wait = autosave_limiter.check(
+        (project_id, coder_id),
+        current_app.config["AUTOSAVE_RATE"],
+        current_app.config["AUTOSAVE_BURST"]
+    )
+    if wait:
+        limited = jsonify({"error": "Too many autosaves, slow down"})
+        limited.headers["Retry-After"] = str(max(1, round(wait)))
+        return limited, 429
+
+    mode = validation_mode(data)
+    if mode is None:
+        return jsonify({"error": "Invalid validation mode"}), 400
+    errors = []
+    if not excluded:
+        categories, errors = check_submission(project_id, categories, mode)
+        if errors and mode == "strict":
+            return jsonify({"error": "Invalid categories", "details": errors}), 400
+
+    save_draft(
+        (project_id, coder_id, video_id),
+        Draft(slug, coder_name, categories, notes, excluded, datetime.utcnow())
+    )
+    if errors:
+        return jsonify({"success": True, "dropped": errors})
     return jsonify({"success": True})
 
 @coding_bp.route("/api/submit", methods=["POST"])
@@ -164,20 +162,47 @@ def submit():
     if not excluded and not categories:
         return jsonify({"error": "Missing categories for non-excluded video"}), 400
 
-    project = Project.query.filter_by(slug=slug).first()
-    coder = Coder.query.filter_by(name=coder_name, project_id=project.id).first()
-    if not project or not coder:
+    project_id, coder_id = resolve_ids_for_write(slug, coder_name)
+    if not project_id or not coder_id:
         return jsonify({"error": "Project or Coder not found"}), 404
 
+    mode = validation_mode(data)
+    if mode is None:
+        return jsonify({"error": "Invalid validation mode"}), 400
+    errors = []
+    if not excluded:
+        categories, errors = check_submission(project_id, categories, mode)
+        if errors and mode == "strict":
+            return jsonify({"error": "Invalid categories", "details": errors}), 400
+        if errors and not any(categories.values()):
+            # Lenient mode dropped every tag; don't submit an empty answer
+            return jsonify({"error": "No valid categories for non-excluded video", "details": errors}), 400
+
+    # A buffered autosave for this video lands first so its revision is kept
+    flush_pending((project_id, coder_id, video_id))
+
+    previous = db.session.query(Result.categories, Result.notes, Result.excluded).filter_by(
+        project_id=project_id,
+        coder_id=coder_id,
+        video_id=video_id
+    ).first()
+    previous = (parse_categories(previous[0]), previous[1], previous[2]) if previous else ({}, "", False)
+    record_revision(
+        project_id, coder_id, video_id,
+        previous, (categories if not excluded else {}, notes, excluded),
+        "submitted"
+    )
+    prune_history(project_id, coder_id, video_id, history_limit())
+
     Result.query.filter_by(
-        project_id=project.id,
-        coder_id=coder.id,
+        project_id=project_id,
+        coder_id=coder_id,
         video_id=video_id
     ).delete()
 
     result = Result(
-        project_id=project.id,
-        coder_id=coder.id,
+        project_id=project_id,
+        coder_id=coder_id,
         video_id=video_id,
         categories=json.dumps(categories) if not excluded else json.dumps({}),
         notes=notes,
@@ -187,9 +212,14 @@ def submit():
     )
     db.session.add(result)
 
-    coder.progress_index += 1
+    Coder.query.filter_by(id=coder_id).update(
+        {Coder.progress_index: Coder.progress_index + 1}, synchronize_session=False
+    )
+    publish_progress(slug, coder_name, video_id, "excluded" if excluded else "submitted")
     db.session.commit()
 
+    if errors:
+        return jsonify({"success": True, "dropped": errors})
     return jsonify({"success": True})
 
 @coding_bp.route("/api/codebook", methods=["POST"])
@@ -202,25 +232,76 @@ def update_codebook():
     if not slug or not category:
         return jsonify({"error": "Missing category or project"}), 400
 
-    project = Project.query.filter_by(slug=slug).first()
+    project = get_project(slug)
     if not project:
         return jsonify({"error": "Project not found"}), 404
 
-    try:
-        codebook = json.loads(project.codebook or "[]")
-    except:
-        codebook = []
+    # A concurrent write only means re-reading; adding is idempotent
+    for _ in range(3):
+        current = get_codebook(project)
+        codebook, _changes = apply_codebook_operations(
+            current, [{"op": "add", "category": category, "tag": tag}]
+        )
+        if codebook == current:
+            return jsonify({"success": True})  # already there
+        try:
+            version = write_codebook(project, codebook)
+            break
+        except CodebookConflict:
+            project = get_project(slug)
+    else:
+        return jsonify({"error": "Codebook is being modified, try again"}), 409
+    publish_codebook(slug, version)
+    db.session.commit()
 
-    existing = next((c for c in codebook if c.get("category") == category), None)
+    return jsonify({"success": True})
 
-    if not existing:
-        new_entry = {"category": category, "tags": [tag] if tag else []}
-        codebook.append(new_entry)
-    else:
-        if tag and tag not in existing["tags"]:
-            existing["tags"].append(tag)
+@coding_bp.route("/api/codebook/bulk", methods=["POST"])
+def bulk_update_codebook():
+    """Apply a list of add/rename/remove operations in one transaction.
+
+    The client sends the codebook version it last read; if the codebook has
+    changed since, nothing is applied and 409 is returned with the current
+    version so the client can refetch and retry.
+    """
+    data = request.get_json()
+    slug = data.get("project")
+    operations = data.get("operations")
+    version = data.get("version")
+
+    if (
+        not slug or not isinstance(operations, list)
+        or isinstance(version, bool) or not isinstance(version, int)
+    ):
+        return jsonify({"error": "Missing project, version or operations"}), 400
 
-    project.codebook = json.dumps(codebook)
+    project = get_project(slug)
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+    if (project.codebook_version or 0) != version:
+        return jsonify({"error": "Codebook has changed", "version": project.codebook_version or 0}), 409
+
+    current = get_codebook(project)
+    try:
+        codebook, changes = apply_codebook_operations(current, operations)
+    except CodebookError as e:
+        return jsonify({"error": str(e)}), 400
+    if codebook == current:
+        # Only adds of existing entries: nothing to write
+        return jsonify({"success": True, "version": version, "codebook": codebook, "updated_results": 0})
+
+    try:
+        new_version = write_codebook(project, codebook, version)
+    except CodebookConflict as e:
+        return jsonify({"error": "Codebook has changed", "version": e.current_version}), 409
+
+    updated_count = update_results_for_changes(project.id, changes)
+    publish_codebook(slug, new_version)
     db.session.commit()
 
-    return jsonify({"success": True})
\ No newline at end of file
+    return jsonify({
+        "success": True,
+        "version": new_version,
+        "codebook": codebook,
+        "updated_results": updated_count
+    })
@@ -0,0 +1,212 @@
+from flask import Blueprint, Response, jsonify, current_app
+from models import db, ProjectEvent
+from routes.cache import resolve_project_id
+from collections import defaultdict
+from datetime import datetime, timedelta
+import itertools
+import threading
+import queue
+import json
+
+events_bp = Blueprint('events', __name__)
+
+KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 256
+# Events older than EVENTS_RETENTION are deleted on every this many logged events
+EVENT_PRUNE_EVERY = 200
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lagged = False  # set when events were dropped because the client fell behind
+
+class Broadcaster:
+    """In-process fan-out of small project events to any number of subscribers"""
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._streams = 0
+
+    def subscribe(self, slug):
+        sub = Subscription(self.maxsize)
+        with self._lock:
+            self._subscribers[slug].add(sub)
+        return sub
+
+    def unsubscribe(self, slug, sub):
+        with self._lock:
+            subs = self._subscribers.get(slug)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[slug]
+
+    def open_stream(self, limit):
+        """Reserve one of `limit` open-stream slots; False if they're all taken"""
+        with self._lock:
+            if self._streams >= limit:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def subscriber_count(self, slug):
+        with self._lock:
+            return len(self._subscribers.get(slug, ()))
+
+    def publish(self, slug, event, data, event_id=None):
+        with self._lock:
+            subs = list(self._subscribers.get(slug, ()))
+        if not subs:
+            return
+        message = (event_id or next(self._ids), event, json.dumps(data))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                sub.lagged = True
+
+class EventRelay:
+    """Relays events from the shared ProjectEvent log to this process's streams.
+
+    Every worker process has its own relay (kept in app.extensions). Its
+    thread starts with the first stream and polls every EVENTS_POLL_INTERVAL
+    seconds for events logged after the last one it saw, whichever process
+    logged them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.broadcaster = Broadcaster()
+        self.last_id = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.last_id is None:
+                # Only relay events logged from now on
+                self.last_id = db.session.query(db.func.max(ProjectEvent.id)).scalar() or 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-relay", daemon=True)
+            self._thread.start()
+
+    def poll(self):
+        """Publish events logged since the last poll to local subscribers; returns how many"""
+        rows = (
+            db.session.query(ProjectEvent.id, ProjectEvent.slug, ProjectEvent.event, ProjectEvent.data)
+            .filter(ProjectEvent.id > (self.last_id or 0))
+            .order_by(ProjectEvent.id)
+            .all()
+        )
+        for row in rows:
+            self.broadcaster.publish(row.slug, row.event, json.loads(row.data), event_id=row.id)
+        if rows:
+            self.last_id = rows[-1].id
+        return len(rows)
+
+    def _run(self):
+        interval = self.app.config["EVENTS_POLL_INTERVAL"]
+        while not self._stop.wait(interval):
+            with self.app.app_context():
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Error polling project events: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+def event_relay():
+    return current_app.extensions["event_relay"]
+
+_logged = itertools.count(1)
+
+def log_event(slug, event, data):
+    """Add an event to the shared log in the current session; it is sent once the caller commits"""
+    if not current_app.config["EVENTS_ENABLED"]:
+        return
+    db.session.add(ProjectEvent(slug=slug, event=event, data=json.dumps(data)))
+    if next(_logged) % EVENT_PRUNE_EVERY == 0:
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config["EVENTS_RETENTION"])
+        ProjectEvent.query.filter(ProjectEvent.created_at < cutoff).delete(synchronize_session=False)
+
+def publish_progress(slug, coder, video_id, status):
+    log_event(slug, "progress", {"coder": coder, "video_id": video_id, "status": status})
+
+def publish_codebook(slug, version=None):
+    log_event(slug, "codebook", {"project": slug, "version": version})
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+@events_bp.route("/api/projects/<slug>/events", methods=["GET"])
+def project_events(slug):
+    """Stream a project's progress and codebook events.
+
+    Events are read from the shared log by this process's relay, so a
+    stream sees writes handled by any worker, up to EVENTS_POLL_INTERVAL
+    late. Each open stream holds a worker thread, so at most
+    EVENTS_MAX_STREAMS are open per process.
+    """
+    if not current_app.config["EVENTS_ENABLED"]:
+        return jsonify({"error": "Live updates are disabled on this server"}), 503
+    if resolve_project_id(slug) is None:
+        return jsonify({"error": "Project not found"}), 404
+    relay = event_relay()
+    broadcaster = relay.broadcaster
+    if not broadcaster.open_stream(current_app.config["EVENTS_MAX_STREAMS"]):
+        busy = jsonify({"error": "Too many open event streams"})
+        busy.headers["Retry-After"] = "30"
+        return busy, 503
+    try:
+        relay.start()
+    except Exception:
+        broadcaster.close_stream()
+        raise
+
+    def stream():
+        # Subscribe on first iteration so an unconsumed response can't leak a subscriber
+        sub = broadcaster.subscribe(slug)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = sub.queue.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if sub.lagged:
+                    # Events were dropped; tell the client to refetch full state
+                    sub.lagged = False
+                    yield format_event(message[0], "resync", json.dumps({"project": slug}))
+                yield format_event(*message)
+        finally:
+            broadcaster.unsubscribe(slug, sub)
+
+    # Not wrapped in stream_with_context: the request's DB session is released
+    # as soon as this returns instead of being held open for the stream
+    response = Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+    # Runs when the server closes the response, even if it was never iterated
+    response.call_on_close(broadcaster.close_stream)
+    return response
@@ -0,0 +1,195 @@
+from flask import Blueprint, request, jsonify, current_app
+from models import db, Coder, ResultRevision
+from routes.cache import resolve_project_id, resolve_coder_id
+import json
+
+history_bp = Blueprint('history', __name__)
+
+def _tag_list(value):
+    # Answers stored without codebook validation can hold any JSON value
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [t if isinstance(t, str) else json.dumps(t) for t in value]
+    return [json.dumps(value)]
+
+def normalize_categories(categories):
+    """Coerce an answer's categories to {category: [tag strings]} so it can be diffed"""
+    if not isinstance(categories, dict):
+        return {}
+    return {str(category): _tag_list(tags) for category, tags in categories.items()}
+
+def diff_categories(old, new):
+    """Return ({category: added tags}, {category: removed tags}) between two answers"""
+    added = {}
+    removed = {}
+    for category, tags in new.items():
+        before = set(old.get(category, ()))
+        extra = [t for t in tags if t not in before]
+        if extra:
+            added[category] = extra
+    for category, tags in old.items():
+        after = set(new.get(category, ()))
+        missing = [t for t in tags if t not in after]
+        if missing:
+            removed[category] = missing
+    return added, removed
+
+def diff_notes(old, new):
+    """Encode a notes edit as [offset, removed text, inserted text].
+
+    Only the span between the common prefix and suffix is stored, so typing
+    at the end of a long note records just the new characters.
+    """
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return [prefix, old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]]
+
+def apply_delta(categories, notes, delta):
+    """Apply one revision's delta to a (categories, notes) state"""
+    categories = {k: list(v) for k, v in categories.items()}
+    for category, tags in delta.get("remove", {}).items():
+        gone = set(tags)
+        categories[category] = [t for t in categories.get(category, []) if t not in gone]
+        if not categories[category]:
+            del categories[category]
+    for category, tags in delta.get("add", {}).items():
+        categories.setdefault(category, []).extend(tags)
+    if "notes" in delta:
+        offset, removed, inserted = delta["notes"]
+        notes = notes[:offset] + inserted + notes[offset + len(removed):]
+    return categories, notes
+
+def record_revision(project_id, coder_id, video_id, old, new, status):
+    """Add a revision for a change to the current session, if anything changed.
+
+    `old` and `new` are (categories, notes, excluded) tuples. The row is
+    inserted with the caller's commit, so it shares the write transaction.
+    """
+    old_categories, old_notes, old_excluded = old
+    new_categories, new_notes, new_excluded = new
+    old_categories = normalize_categories(old_categories)
+    new_categories = normalize_categories(new_categories)
+    added, removed = diff_categories(old_categories, new_categories)
+    delta = {}
+    if added:
+        delta["add"] = added
+    if removed:
+        delta["remove"] = removed
+    if (old_notes or "") != (new_notes or ""):
+        delta["notes"] = diff_notes(old_notes or "", new_notes or "")
+    if bool(old_excluded) != bool(new_excluded):
+        delta["excluded"] = bool(new_excluded)
+    if not delta and status == "draft":
+        # Autosaves that change nothing don't grow the log
+        return None
+
+    base = None
+    if (old_categories or old_notes or old_excluded) and not _has_history(project_id, coder_id, video_id):
+        # The answer predates the log; keep its state so later deltas replay from it
+        base = json.dumps({"categories": old_categories, "notes": old_notes or ""})
+
+    revision = ResultRevision(
+        project_id=project_id,
+        coder_id=coder_id,
+        video_id=video_id,
+        status=status,
+        excluded=bool(new_excluded),
+        delta=json.dumps(delta, separators=(",", ":")),
+        base=base
+    )
+    db.session.add(revision)
+    return revision
+
+def _has_history(project_id, coder_id, video_id):
+    with db.session.no_autoflush:
+        return db.session.query(ResultRevision.id).filter_by(
+            project_id=project_id, coder_id=coder_id, video_id=video_id
+        ).first() is not None
+
+def parse_categories(raw):
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def prune_history(project_id, coder_id, video_id, limit):
+    """Drop the oldest revisions beyond `limit`, folding them into the new oldest's base"""
+    query = ResultRevision.query.filter_by(project_id=project_id, coder_id=coder_id, video_id=video_id)
+    excess = query.count() - limit
+    if excess <= 0:
+        return 0
+
+    revisions = query.order_by(ResultRevision.id).limit(excess + 1).all()
+
+    categories, notes = _base_state(revisions[0])
+    for revision in revisions[:excess]:
+        categories, notes = apply_delta(categories, notes, json.loads(revision.delta))
+        db.session.delete(revision)
+    revisions[excess].base = json.dumps({"categories": categories, "notes": notes})
+    return excess
+
+def _base_state(revision):
+    if revision.base:
+        base = json.loads(revision.base)
+        return base.get("categories", {}), base.get("notes", "")
+    return {}, ""
+
+def history_limit():
+    return current_app.config.get("RESULT_HISTORY_LIMIT", 200)
+
+@history_bp.route("/api/result-history", methods=["GET"])
+def result_history():
+    """Revisions for one video and/or coder, oldest first, with the answer after each"""
+    slug = request.args.get("project")
+    video_id = request.args.get("video_id")
+    coder_name = request.args.get("coder")
+
+    if not slug or not (video_id or coder_name):
+        return jsonify({"error": "Missing project, and video_id or coder"}), 400
+
+    project_id = resolve_project_id(slug)
+    if not project_id:
+        return jsonify({"error": "Project not found"}), 404
+
+    query = ResultRevision.query.filter_by(project_id=project_id)
+    if coder_name:
+        coder_id = resolve_coder_id(project_id, coder_name)
+        if not coder_id:
+            return jsonify({"error": "Coder not found"}), 404
+        query = query.filter_by(coder_id=coder_id)
+    if video_id:
+        query = query.filter_by(video_id=video_id)
+
+    coder_names = dict(db.session.query(Coder.id, Coder.name).filter_by(project_id=project_id).all())
+    states = {}
+    history = []
+    for revision in query.order_by(ResultRevision.id):
+        key = (revision.coder_id, revision.video_id)
+        if key not in states:
+            states[key] = _base_state(revision)
+        delta = json.loads(revision.delta)
+        states[key] = apply_delta(*states[key], delta)
+        history.append({
+            "id": revision.id,
+            "coder": coder_names.get(revision.coder_id),
+            "video_id": revision.video_id,
+            "status": revision.status,
+            "excluded": bool(revision.excluded),
+            "timestamp": revision.timestamp.isoformat() if revision.timestamp else None,
+            "delta": delta,
+            "categories": states[key][0],
+            "notes": states[key][1]
+        })
+
+    return jsonify({"history": history})
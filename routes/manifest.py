@@ -0,0 +1,202 @@
+from models import db, ProjectFile
+from routes.cache import LRUCache
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import bisect
+import json
+import csv
+import os
+
+# project_file id -> (stat signature, the file's videos)
+file_rows = LRUCache(maxsize=64, ttl=3600)
+# project id -> (manifest signature, video list)
+video_lists = LRUCache(maxsize=32, ttl=3600)
+
+def project_folder(project):
+    return os.path.join("uploads", project.slug)
+
+def video_id_of(row):
+    return row.get("id") or row.get("video_id")
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _stat_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def parse_file(pf, path):
+    """Return the rows of an uploaded file.
+
+    Files that aren't CSVs, or can't be decoded as UTF-8 CSV, have no rows,
+    so one bad upload doesn't break the project's video list.
+    """
+    if not pf.filename.lower().endswith(".csv"):
+        return []
+    try:
+        with open(path, newline='', encoding='utf-8') as csvfile:
+            return list(csv.DictReader(csvfile))
+    except (UnicodeDecodeError, csv.Error) as e:
+        print(f"Warning: skipping unreadable CSV {path}: {e}")
+        return []
+
+def ordered_files(project):
+    return ProjectFile.query.filter_by(project_id=project.id).order_by(ProjectFile.id).all()
+
+def ingest_file(project, pf, seen):
+    """Record a file's stat, checksum and position in the video list.
+
+    `seen` holds the video ids of every earlier file in the manifest and is
+    updated in place. The file's videos occupy positions
+    row_offset .. row_offset + row_count - 1, and skipped_rows lists the
+    rows that added no video (duplicate or missing id), so any one video can
+    later be found by reading only its own file.
+    """
+    path = os.path.join(project_folder(project), pf.filename)
+    pf.row_offset = len(seen)
+    if not os.path.exists(path):
+        pf.row_count = 0
+        pf.skipped_rows = "[]"
+        pf.checksum = pf.file_size = pf.file_mtime_ns = None
+        return
+
+    signature = _stat_signature(path)
+    kept = []
+    skipped = []
+    for i, row in enumerate(parse_file(pf, path)):
+        vid = video_id_of(row)
+        if vid and vid not in seen:
+            seen.add(vid)
+            kept.append(row)
+        else:
+            skipped.append(i)
+    pf.row_count = len(kept)
+    pf.skipped_rows = json.dumps(skipped)
+    pf.checksum = file_checksum(path)
+    pf.file_mtime_ns, pf.file_size = signature
+    file_rows.set(pf.id, (signature, kept))
+
+def _needs_ingest(pf, path):
+    """Whether a file's stored position is missing or out of date.
+
+    A file whose size and mtime match what was stored is trusted as is. If
+    they differ the file is re-hashed, and only a changed checksum counts.
+    """
+    if not os.path.exists(path):
+        # A file that went missing keeps its place but contributes nothing
+        return bool(pf.row_count)
+    if pf.checksum is None or pf.skipped_rows is None:
+        return True
+    signature = _stat_signature(path)
+    if signature == (pf.file_mtime_ns, pf.file_size):
+        return False
+    if file_checksum(path) != pf.checksum:
+        return True
+    pf.file_mtime_ns, pf.file_size = signature
+    return False
+
+def file_videos(project, pf):
+    """Return the videos one manifest file contributes, reading only that file"""
+    if not pf.row_count:
+        return []
+    path = os.path.join(project_folder(project), pf.filename)
+    signature = _stat_signature(path)
+    cached = file_rows.get(pf.id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    skipped = set(json.loads(pf.skipped_rows or "[]"))
+    kept = [row for i, row in enumerate(parse_file(pf, path)) if i not in skipped]
+    file_rows.set(pf.id, (signature, kept))
+    return kept
+
+def _register_files(project, folder, files):
+    """Add manifest rows for CSVs in the upload folder that predate the manifest"""
+    known = {pf.filename for pf in files}
+    unregistered = sorted(
+        name for name in os.listdir(folder)
+        if name.endswith(".csv") and name not in known
+    )
+    for name in unregistered:
+        db.session.add(ProjectFile(project_id=project.id, filename=name, original_name=name))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker registered it first
+            db.session.rollback()
+    return ordered_files(project) if unregistered else files
+
+def sync_manifest(project):
+    """Bring the project's ProjectFile manifest up to date and return it in order.
+
+    CSVs in the upload folder that predate the manifest are registered in
+    filename order. Files are only read when they are new or their contents
+    changed; that file and every later one are then re-ingested, since their
+    positions depend on it. Otherwise this only stats each file.
+    """
+    folder = project_folder(project)
+    files = ordered_files(project)
+    if os.path.isdir(folder):
+        files = _register_files(project, folder, files)
+
+    first = next(
+        (i for i, pf in enumerate(files) if _needs_ingest(pf, os.path.join(folder, pf.filename))),
+        None
+    )
+    if first is None:
+        if any(pf in db.session.dirty for pf in files):
+            db.session.commit()  # refreshed stat signatures of touched files
+        return files
+
+    seen = set()
+    for pf in files[:first]:
+        seen.update(video_id_of(row) for row in file_videos(project, pf))
+    for pf in files[first:]:
+        ingest_file(project, pf, seen)
+    db.session.commit()
+    video_lists.pop(project.id)
+    return files
+
+def video_total(project):
+    """Number of videos in the project, from the manifest alone"""
+    return sum(pf.row_count or 0 for pf in sync_manifest(project))
+
+def video_at(project, index):
+    """Return (video row or None, total videos) for one position.
+
+    The file holding the position is found from row_offset/row_count, so
+    only that file is read.
+    """
+    files = [pf for pf in sync_manifest(project) if pf.row_count]
+    total = sum(pf.row_count for pf in files)
+    if index < 0 or index >= total:
+        return None, total
+    pf = files[bisect.bisect_right([f.row_offset for f in files], index) - 1]
+    return file_videos(project, pf)[index - pf.row_offset], total
+
+def load_video_list(project):
+    """Return the project's videos in stable manifest order.
+
+    The assembled list is reused until the manifest changes; each file's
+    videos come from the per-file cache.
+    """
+    files = sync_manifest(project)
+    signature = tuple((pf.id, pf.checksum, pf.row_offset, pf.row_count) for pf in files)
+
+    cached = video_lists.get(project.id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    videos = []
+    for pf in files:
+        videos.extend(file_videos(project, pf))
+
+    video_lists.set(project.id, (signature, videos))
+    return videos
+
+def invalidate_video_list(project_id):
+    video_lists.pop(project_id)
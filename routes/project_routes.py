@@ -1,34 +1,26 @@
 from flask import Blueprint, request, jsonify, send_file
-from models import db, Project, Coder, Result, ProjectFile
+from models import db, Project, Coder, Result, ProjectFile, ResultRevision
 from sqlalchemy.exc import IntegrityError
-from routes.utils import generate_codebook_json, generate_results_csv, get_results_csv_text
+from routes.utils import (
+    generate_codebook_json, generate_results_csv, get_results_csv_text,
+    generate_results_csv_gz, generate_results_ndjson, generate_results_parquet
+)
+from routes.cache import (
+    get_project, get_coder, get_codebook, invalidate_project, invalidate_coder, cache_stats
+)
+from routes.codebook import write_codebook, CodebookConflict
+from routes.manifest import video_total, invalidate_video_list
+from routes.events import publish_codebook
+from routes.autosave import pending_autosaves
 from werkzeug.utils import secure_filename
-import os, json, csv
+import os, json
 
 project_bp = Blueprint('project', __name__)
 
-def load_video_list(project):
-    folder = os.path.join("uploads", project.slug)
-    videos = []
-    seen = set()
-    if os.path.isdir(folder):
-        for f in os.listdir(folder):
-            path = os.path.join(folder, f)
-            if path.endswith(".csv"):
-                with open(path, newline='', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    for row in reader:
-                        vid = row.get("id") or row.get("video_id")
-                        if vid and vid not in seen:
-                            videos.append(row)
-                            seen.add(vid)
-    return videos
-
 def refresh_video_count(project):
-    videos = load_video_list(project)
-    project.video_count = len(videos)
+    project.video_count = video_total(project)
     db.session.commit()
-    return videos
+    return project.video_count
 
 @project_bp.route("/api/projects", methods=["POST"])
 def create_project():
@@ -48,6 +40,7 @@ def create_project():
     project = Project(name=name, slug=slug, codebook=json.dumps(codebook))
     db.session.add(project)
     db.session.commit()
+    invalidate_project(slug, project.id)
 
     for coder in coders:
         db.session.add(Coder(name=coder, project_id=project.id))
@@ -190,20 +183,32 @@ def update_results_for_codebook_changes(project, old_codebook, new_codebook):
 
 @project_bp.route("/api/project/<slug>", methods=["PUT"])
 def update_project(slug):
-    project = Project.query.filter_by(slug=slug).first()
+    project = get_project(slug)
     if not project:
         return jsonify({"error": "Project not found"}), 404
 
     data = request.get_json()
+    expected_version = data.get("codebook_version")
+    if expected_version is not None and (
+        isinstance(expected_version, bool) or not isinstance(expected_version, int)
+    ):
+        return jsonify({"error": "codebook_version must be an integer"}), 400
+
     old_codebook = project.codebook
     project.name = data.get("name", project.name)
-    new_codebook = data.get("codebook", [])
-    project.codebook = json.dumps(new_codebook)
-    
-    # Update existing results to maintain data integrity
-    updated_count = update_results_for_codebook_changes(project, old_codebook, project.codebook)
-    
+    new_codebook = data.get("codebook")
+    # Leaving out the codebook, or sending it back unchanged, doesn't write it or bump its version
+    if new_codebook is not None and new_codebook != json.loads(old_codebook or "[]"):
+        try:
+            version = write_codebook(project, new_codebook, expected_version)
+        except CodebookConflict as e:
+            return jsonify({"error": "Codebook has changed", "version": e.current_version}), 409
+
+        # Update existing results to maintain data integrity
+        update_results_for_codebook_changes(project, old_codebook, project.codebook)
+        publish_codebook(slug, version)
     db.session.commit()
+    invalidate_project(slug)
     
     # Return the complete updated project data
     coders = [c.name for c in project.coders]
@@ -233,17 +238,27 @@ def update_project(slug):
 
 @project_bp.route("/api/project/<slug>", methods=["DELETE"])
 def delete_project(slug):
-    project = Project.query.filter_by(slug=slug).first()
+    project = get_project(slug)
     if not project:
         return jsonify({"error": "Project not found"}), 404
+    project_id = project.id
+    # Delete dependent rows explicitly; SQLite doesn't enforce the foreign keys
+    # and reused ids would otherwise inherit them
+    pending_autosaves().discard_where(lambda key: key[0] == project_id)
+    ResultRevision.query.filter_by(project_id=project_id).delete()
+    Result.query.filter_by(project_id=project_id).delete()
+    Coder.query.filter_by(project_id=project_id).delete()
+    ProjectFile.query.filter_by(project_id=project_id).delete()
     db.session.delete(project)
     db.session.commit()
+    invalidate_project(slug, project_id)
+    invalidate_video_list(project_id)
     return jsonify({"success": True})
 
 @project_bp.route("/api/project-info", methods=["GET"])
 def project_info():
     slug = request.args.get("project")
-    project = Project.query.filter_by(slug=slug).first()
+    project = get_project(slug)
     if not project:
         return jsonify({"error": "Not found"}), 404
     coders = [c.name for c in project.coders]
@@ -251,7 +266,8 @@ def project_info():
         "name": project.name,
         "slug": slug,
         "coders": coders,
-        "codebook": json.loads(project.codebook or "[]")
+        "codebook": get_codebook(project),
+        "codebook_version": project.codebook_version or 0
     })
 
 
@@ -262,7 +278,7 @@ def upload_data():
     if not file or not slug:
         return jsonify({"error": "Missing file or project"}), 400
 
-    project = Project.query.filter_by(slug=slug).first()
+    project = get_project(slug)
     if not project:
         return jsonify({"error": "Project not found"}), 404
 
@@ -307,36 +323,56 @@ def download_results():
         if csv_text is None:
             return jsonify({"error": "No results found"}), 404
         return csv_text
+    elif format_type == "csv.gz":
+        return generate_results_csv_gz(slug)
+    elif format_type == "ndjson":
+        return generate_results_ndjson(slug)
+    elif format_type == "parquet":
+        return generate_results_parquet(slug)
     else:
         return generate_results_csv(slug)
 
 @project_bp.route("/api/coder", methods=["POST"])
 def add_coder():
     data = request.get_json()
-    project = Project.query.filter_by(slug=data.get("project")).first()
+    project = get_project(data.get("project"))
     if not project:
         return jsonify({"error": "Project not found"}), 404
     new = Coder(name=data["coder"], project_id=project.id)
     db.session.add(new)
     db.session.commit()
+    invalidate_coder(project.id, data["coder"])
     return jsonify({"success": True})
 
 @project_bp.route("/api/coder", methods=["PUT"])
 def rename_coder():
     data = request.get_json()
-    project = Project.query.filter_by(slug=data.get("project")).first()
-    coder = Coder.query.filter_by(name=data.get("old_name"), project_id=project.id).first()
+    project = get_project(data.get("project"))
+    coder = get_coder(project.id, data.get("old_name")) if project else None
     if not coder:
         return jsonify({"error": "Coder not found"}), 404
     coder.name = data["new_name"]
     db.session.commit()
+    invalidate_coder(project.id, data.get("old_name"))
+    invalidate_coder(project.id, data["new_name"])
     return jsonify({"success": True})
 
 @project_bp.route("/api/coder", methods=["DELETE"])
 def delete_coder():
     data = request.get_json()
-    project = Project.query.filter_by(slug=data.get("project")).first()
-    coder = Coder.query.filter_by(name=data.get("coder"), project_id=project.id).first()
+    project = get_project(data.get("project"))
+    coder = get_coder(project.id, data.get("coder")) if project else None
+    if not coder:
+        return jsonify({"error": "Coder not found"}), 404
+    coder_id = coder.id
+    pending_autosaves().discard_where(lambda key: key[1] == coder_id)
+    ResultRevision.query.filter_by(coder_id=coder_id).delete()
+    Result.query.filter_by(coder_id=coder_id).delete()
     db.session.delete(coder)
     db.session.commit()
+    invalidate_coder(project.id, data.get("coder"))
     return jsonify({"success": True})
+
+@project_bp.route("/api/cache-stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(cache_stats())
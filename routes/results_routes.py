@@ -0,0 +1,128 @@
+from flask import Blueprint, request, jsonify
+from models import db, Coder, Result
+from routes.cache import resolve_project_id, resolve_coder_id
+from routes.utils import result_status
+import json
+
+results_bp = Blueprint('results', __name__)
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+# Requested field -> columns it needs loaded
+RESULT_FIELDS = {
+    "id": (Result.id,),
+    "coder": (Result.coder_id,),
+    "video_id": (Result.video_id,),
+    "status": (Result.status, Result.excluded),
+    "excluded": (Result.excluded,),
+    "timestamp": (Result.timestamp,),
+    "notes": (Result.notes,),
+    "categories": (Result.categories,),
+}
+
+def _status_filter(query, status):
+    not_excluded = db.or_(Result.excluded.is_(False), Result.excluded.is_(None))
+    if status == "excluded":
+        return query.filter(Result.excluded.is_(True))
+    if status == "submitted":
+        return query.filter(not_excluded, Result.status == "submitted")
+    # "saved" is how exports label drafts
+    return query.filter(
+        not_excluded,
+        db.or_(Result.status != "submitted", Result.status.is_(None))
+    )
+
+def _parse_categories(raw, excluded):
+    if not raw or excluded:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+@results_bp.route("/api/results", methods=["GET"])
+def list_results():
+    """Page through a project's results in id order.
+
+    Pass the returned next_after_id as after_id to fetch the next page; it is
+    null once the last page has been returned. `fields` limits both the
+    response and the columns read, e.g. omitting notes avoids loading them.
+    """
+    slug = request.args.get("project")
+    coder_name = request.args.get("coder")
+    status = request.args.get("status")
+    fields_param = request.args.get("fields")
+
+    if not slug:
+        return jsonify({"error": "Missing project"}), 400
+    try:
+        after_id = int(request.args.get("after_id", 0))
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "after_id and limit must be integers"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+    limit = min(limit, MAX_LIMIT)
+
+    if fields_param:
+        fields = [f.strip() for f in fields_param.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in RESULT_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    else:
+        fields = list(RESULT_FIELDS)
+    if status and status not in ("submitted", "saved", "draft", "excluded"):
+        return jsonify({"error": "Invalid status"}), 400
+
+    project_id = resolve_project_id(slug)
+    if not project_id:
+        return jsonify({"error": "Project not found"}), 404
+
+    columns = {"id": Result.id}
+    for field in fields:
+        for column in RESULT_FIELDS[field]:
+            columns[column.key] = column
+    if "categories" in fields:
+        columns["excluded"] = Result.excluded
+
+    query = db.session.query(*columns.values()).filter(
+        Result.project_id == project_id, Result.id > after_id
+    )
+    if coder_name:
+        coder_id = resolve_coder_id(project_id, coder_name)
+        if not coder_id:
+            return jsonify({"error": "Coder not found"}), 404
+        query = query.filter(Result.coder_id == coder_id)
+    if status:
+        query = _status_filter(query, status)
+
+    rows = query.order_by(Result.id).limit(limit).all()
+
+    coder_names = {}
+    if "coder" in fields:
+        coder_names = dict(db.session.query(Coder.id, Coder.name).filter_by(project_id=project_id).all())
+
+    results = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == "coder":
+                item["coder"] = coder_names.get(row.coder_id)
+            elif field == "status":
+                item["status"] = result_status(row)
+            elif field == "excluded":
+                item["excluded"] = bool(row.excluded)
+            elif field == "timestamp":
+                item["timestamp"] = row.timestamp.isoformat() if row.timestamp else None
+            elif field == "categories":
+                item["categories"] = _parse_categories(row.categories, row.excluded)
+            else:
+                item[field] = getattr(row, field)
+        results.append(item)
+
+    return jsonify({
+        "results": results,
+        "next_after_id": rows[-1].id if len(rows) == limit else None,
+        "limit": limit
+    })
@@ -0,0 +1,280 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from models import db, Project, Coder, Result, ProjectFile, ResultRevision
+from routes.cache import get_project, invalidate_project
+from routes.manifest import sync_manifest, project_folder
+from routes.utils import iter_project_results, iter_project_rows
+from sqlalchemy import insert
+from datetime import datetime
+import zipfile
+import shutil
+import json
+import io
+import os
+
+snapshot_bp = Blueprint('snapshot', __name__)
+
+SNAPSHOT_FORMAT = 1
+RESTORE_BATCH_SIZE = 1000
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that zipfile writes into and the response drains"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _load_categories(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+def _dump_categories(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+def _insert_ndjson(zf, name, model, to_row):
+    """Bulk-insert one row per line of an NDJSON entry, in batches; returns the row count"""
+    inserted = 0
+    batch = []
+    with zf.open(name) as raw:
+        for line in io.TextIOWrapper(raw, encoding="utf-8"):
+            if not line.strip():
+                continue
+            batch.append(to_row(json.loads(line)))
+            if len(batch) >= RESTORE_BATCH_SIZE:
+                db.session.execute(insert(model), batch)
+                inserted += len(batch)
+                batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        inserted += len(batch)
+    return inserted
+
+@snapshot_bp.route("/api/project/<slug>/snapshot", methods=["GET"])
+def snapshot_project(slug):
+    """Stream a zip of the project row, coders, results and their revisions (NDJSON) and uploaded CSVs.
+
+    Nothing is staged on disk: zip entries are written into an in-memory
+    buffer that is flushed to the client after every file chunk and every
+    batch of results.
+    """
+    project = get_project(slug)
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    folder = project_folder(project)
+    files = [pf for pf in sync_manifest(project) if os.path.exists(os.path.join(folder, pf.filename))]
+    project_data = {
+        "format": SNAPSHOT_FORMAT,
+        "name": project.name,
+        "slug": project.slug,
+        "codebook": json.loads(project.codebook or "[]"),
+        "codebook_version": project.codebook_version or 0,
+        "video_count": project.video_count,
+        "created_at": _iso(project.created_at),
+        "files": [{
+            "filename": pf.filename,
+            "original_name": pf.original_name,
+            "uploaded_at": _iso(pf.uploaded_at),
+            "row_offset": pf.row_offset,
+            "row_count": pf.row_count,
+            "checksum": pf.checksum,
+            "skipped_rows": json.loads(pf.skipped_rows) if pf.skipped_rows is not None else None
+        } for pf in files]
+    }
+    coders = [
+        {"name": c.name, "progress_index": c.progress_index}
+        for c in Coder.query.filter_by(project_id=project.id).order_by(Coder.id)
+    ]
+    project_id = project.id
+
+    def generate():
+        sink = _StreamBuffer()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("project.json", json.dumps(project_data, indent=2))
+            zf.writestr("coders.json", json.dumps(coders, indent=2))
+            yield sink.drain()
+
+            with zf.open("results.ndjson", "w", force_zip64=True) as out:
+                for i, (r, coder_name) in enumerate(iter_project_results(project_id), 1):
+                    out.write((json.dumps({
+                        "coder": coder_name,
+                        "video_id": r.video_id,
+                        "categories": _load_categories(r.categories),
+                        "notes": r.notes,
+                        "timestamp": _iso(r.timestamp),
+                        "status": r.status,
+                        "excluded": bool(r.excluded)
+                    }) + "\n").encode("utf-8"))
+                    if i % RESTORE_BATCH_SIZE == 0:
+                        yield sink.drain()
+            yield sink.drain()
+
+            with zf.open("revisions.ndjson", "w", force_zip64=True) as out:
+                for i, (rev, coder_name) in enumerate(iter_project_rows(ResultRevision, project_id), 1):
+                    out.write((json.dumps({
+                        "coder": coder_name,
+                        "video_id": rev.video_id,
+                        "status": rev.status,
+                        "excluded": bool(rev.excluded),
+                        "timestamp": _iso(rev.timestamp),
+                        "delta": json.loads(rev.delta),
+                        "base": json.loads(rev.base) if rev.base else None
+                    }) + "\n").encode("utf-8"))
+                    if i % RESTORE_BATCH_SIZE == 0:
+                        yield sink.drain()
+            yield sink.drain()
+
+            for pf in files:
+                with open(os.path.join(folder, pf.filename), "rb") as src, \
+                        zf.open(f"uploads/{pf.filename}", "w", force_zip64=True) as out:
+                    for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                        out.write(chunk)
+                        yield sink.drain()
+        yield sink.drain()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f"attachment;filename={slug}_snapshot.zip"
+        }
+    )
+
+@snapshot_bp.route("/api/projects/restore", methods=["POST"])
+def restore_project():
+    """Recreate a project from a snapshot zip.
+
+    The slug and name can be overridden with form fields. Results and
+    revisions are bulk-inserted in batches from the streamed NDJSON entries,
+    in their original order, and everything is committed in one transaction.
+    Snapshots taken before revisions were included restore without history.
+    """
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "Missing snapshot file"}), 400
+
+    try:
+        zf = zipfile.ZipFile(file.stream)
+        project_data = json.loads(zf.read("project.json"))
+        coders = json.loads(zf.read("coders.json"))
+    except (zipfile.BadZipFile, KeyError, ValueError):
+        return jsonify({"error": "Invalid snapshot archive"}), 400
+    if project_data.get("format") != SNAPSHOT_FORMAT:
+        return jsonify({"error": "Unsupported snapshot format"}), 400
+    coder_names = [c.get("name") for c in coders]
+    if len(set(coder_names)) != len(coder_names):
+        # Results reference coders by name, so duplicates would be merged
+        return jsonify({"error": "Snapshot has duplicate coder names"}), 400
+
+    slug = request.form.get("slug") or project_data["slug"]
+    name = request.form.get("name") or project_data["name"]
+    if not slug or slug in (".", "..") or os.path.basename(slug) != slug:
+        return jsonify({"error": "Invalid project slug"}), 400
+    if Project.query.filter_by(slug=slug).first():
+        return jsonify({"error": "Project already exists"}), 409
+
+    folder = os.path.join("uploads", slug)
+    if os.path.isdir(folder) and os.listdir(folder):
+        return jsonify({"error": "Upload folder for this project is not empty"}), 409
+
+    try:
+        project = Project(
+            slug=slug,
+            name=name,
+            codebook=json.dumps(project_data.get("codebook", [])),
+            codebook_version=project_data.get("codebook_version", 0),
+            video_count=project_data.get("video_count", 0),
+            created_at=_parse_time(project_data.get("created_at")) or datetime.utcnow()
+        )
+        db.session.add(project)
+        db.session.flush()
+
+        new_coders = [
+            Coder(name=c["name"], project_id=project.id, progress_index=c.get("progress_index", 0))
+            for c in coders
+        ]
+        db.session.add_all(new_coders)
+        db.session.flush()
+        coder_ids = {c.name: c.id for c in new_coders}
+
+        os.makedirs(folder, exist_ok=True)
+        for f in project_data.get("files", []):
+            filename = os.path.basename(f["filename"])
+            with zf.open(f"uploads/{f['filename']}") as src, open(os.path.join(folder, filename), "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            db.session.add(ProjectFile(
+                project_id=project.id,
+                filename=filename,
+                original_name=f.get("original_name") or filename,
+                uploaded_at=_parse_time(f.get("uploaded_at")),
+                row_offset=f.get("row_offset"),
+                row_count=f.get("row_count"),
+                checksum=f.get("checksum"),
+                # Snapshots without skipped_rows are re-ingested on first use
+                skipped_rows=json.dumps(f["skipped_rows"]) if f.get("skipped_rows") is not None else None
+            ))
+
+        restored = _insert_ndjson(zf, "results.ndjson", Result, lambda r: {
+            "project_id": project.id,
+            "coder_id": coder_ids[r["coder"]],
+            "video_id": r["video_id"],
+            "categories": _dump_categories(r.get("categories")),
+            "notes": r.get("notes"),
+            "timestamp": _parse_time(r.get("timestamp")),
+            "status": r.get("status"),
+            "excluded": r.get("excluded", False)
+        })
+        revisions = 0
+        if "revisions.ndjson" in zf.namelist():
+            revisions = _insert_ndjson(zf, "revisions.ndjson", ResultRevision, lambda r: {
+                "project_id": project.id,
+                "coder_id": coder_ids[r["coder"]],
+                "video_id": r["video_id"],
+                "status": r.get("status"),
+                "excluded": r.get("excluded", False),
+                "timestamp": _parse_time(r.get("timestamp")),
+                "delta": json.dumps(r["delta"], separators=(",", ":")),
+                "base": json.dumps(r["base"]) if r.get("base") is not None else None
+            })
+
+        db.session.commit()
+    except (KeyError, ValueError, zipfile.BadZipFile) as e:
+        db.session.rollback()
+        shutil.rmtree(folder, ignore_errors=True)
+        return jsonify({"error": f"Invalid snapshot archive: {e}"}), 400
+    except Exception:
+        db.session.rollback()
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+
+    invalidate_project(slug)
+    return jsonify({
+        "success": True,
+        "slug": slug,
+        "coders": len(coder_ids),
+        "files": len(project_data.get("files", [])),
+        "results": restored,
+        "revisions": revisions
+    })
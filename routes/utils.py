@@ -1,15 +1,21 @@
-from flask import jsonify, Response
+from flask import jsonify, Response, stream_with_context
 from models import db, Project, Result, Coder
+from routes.cache import get_codebook
+import tempfile
+import gzip
 import json
 import csv
 import io
 
+EXPORT_BATCH_SIZE = 1000
+RESULT_CSV_HEADERS = ["coder", "video_id", "status", "timestamp", "notes", "categories"]
+
 def generate_codebook_json(slug):
     project = Project.query.filter_by(slug=slug).first()
     if not project or not project.codebook:
         return jsonify({"error": "No codebook found"}), 404
 
-    codebook_data = json.loads(project.codebook or "[]")
+    codebook_data = get_codebook(project)
     json_str = json.dumps(codebook_data, indent=2)
 
     return Response(
@@ -21,54 +27,12 @@ def generate_codebook_json(slug):
     )
 
 def generate_results_csv(slug):
-    project = Project.query.filter_by(slug=slug).first()
-    if not project:
-        return jsonify({"error": "Project not found"}), 404
+    project, error = _project_with_results(slug)
+    if error:
+        return error
 
-    results = Result.query.filter_by(project_id=project.id).all()
-    if not results:
-        return jsonify({"error": "No results found"}), 404
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write CSV headers
-    writer.writerow(["coder", "video_id", "status", "timestamp", "notes", "categories"])
-    
-    for r in results:
-        # Determine the actual status
-        if r.excluded:
-            actual_status = "excluded"
-        elif r.status == "submitted":
-            actual_status = "submitted"
-        else:
-            actual_status = "saved"  # draft status
-        
-        # Parse categories for better readability
-        categories_display = ""
-        if r.categories and not r.excluded:
-            try:
-                categories_data = json.loads(r.categories)
-                category_pairs = []
-                for category, tags in categories_data.items():
-                    if tags:
-                        category_pairs.append(f"{category}: {', '.join(tags)}")
-                categories_display = "; ".join(category_pairs)
-            except json.JSONDecodeError:
-                categories_display = r.categories
-        
-        writer.writerow([
-            r.coder.name,
-            r.video_id,
-            actual_status,
-            r.timestamp.isoformat() if r.timestamp else "",
-            r.notes or "",
-            categories_display
-        ])
-
-    output.seek(0)
     return Response(
-        output,
+        _results_csv(project.id),
         mimetype='text/csv',
         headers={
             "Content-Disposition": f"attachment;filename={slug}_results.csv"
@@ -80,51 +44,239 @@ def get_results_csv_text(slug):
     project = Project.query.filter_by(slug=slug).first()
     if not project:
         return None
-
-    results = Result.query.filter_by(project_id=project.id).all()
-    if not results:
+    if not Result.query.filter_by(project_id=project.id).first():
         return None
 
+    return _results_csv(project.id)
+
+def _results_csv(project_id):
     output = io.StringIO()
     writer = csv.writer(output)
-    
-    # Write CSV headers
-    writer.writerow(["coder", "video_id", "status", "timestamp", "notes", "categories"])
-    
-    for r in results:
-        # Determine the actual status
-        if r.excluded:
-            actual_status = "excluded"
-        elif r.status == "submitted":
-            actual_status = "submitted"
-        else:
-            actual_status = "saved"  # draft status
-        
-        # Parse categories for better readability
-        categories_display = ""
-        if r.categories and not r.excluded:
-            try:
-                categories_data = json.loads(r.categories)
-                category_pairs = []
-                for category, tags in categories_data.items():
-                    if tags:
-                        category_pairs.append(f"{category}: {', '.join(tags)}")
-                categories_display = "; ".join(category_pairs)
-            except json.JSONDecodeError:
-                categories_display = r.categories
-        
-        writer.writerow([
-            r.coder.name,
-            r.video_id,
-            actual_status,
-            r.timestamp.isoformat() if r.timestamp else "",
-            r.notes or "",
-            categories_display
-        ])
-
-    output.seek(0)
+    writer.writerow(RESULT_CSV_HEADERS)
+    for r, coder_name in iter_project_results(project_id):
+        writer.writerow(_csv_row(r, coder_name))
     return output.getvalue()
 
+def result_status(r):
+    """Status label used in exports: excluded, submitted or saved (draft)"""
+    if r.excluded:
+        return "excluded"
+    elif r.status == "submitted":
+        return "submitted"
+    return "saved"
+
+def parse_result_categories(r):
+    """Return a result's categories as a dict, or {} when excluded/empty/malformed"""
+    if not r.categories or r.excluded:
+        return {}
+    try:
+        data = json.loads(r.categories)
+    except json.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def iter_project_results(project_id, batch_size=EXPORT_BATCH_SIZE):
+    """Yield a project's results in id order, one batch at a time"""
+    return iter_project_rows(Result, project_id, batch_size)
+
+def iter_project_rows(model, project_id, batch_size=EXPORT_BATCH_SIZE):
+    """Yield (row, coder name) for a project's rows of a per-coder model, in id order.
+
+    Uses keyset pagination on the id so only one batch is held in memory,
+    and resolves coder names once up front instead of per row.
+    """
+    coder_names = dict(
+        db.session.query(Coder.id, Coder.name).filter_by(project_id=project_id).all()
+    )
+    last_id = 0
+    while True:
+        batch = (
+            model.query
+            .filter(model.project_id == project_id, model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for r in batch:
+            yield r, coder_names.get(r.coder_id, "")
+        last_id = batch[-1].id
+        # Drop the batch from the identity map so memory stays flat
+        db.session.expunge_all()
+
+def codebook_tags(codebook_data):
+    """Flatten a codebook into ordered (category, tag) pairs"""
+    pairs = []
+    for cat in codebook_data:
+        cat_name = cat.get("category", "")
+        for tag in cat.get("tags", []):
+            tag_name = tag if isinstance(tag, str) else tag.get("tag", "")
+            pairs.append((cat_name, tag_name))
+    return pairs
+
+def _csv_row(r, coder_name):
+    categories_display = ""
+    if r.categories and not r.excluded:
+        try:
+            categories_data = json.loads(r.categories)
+            category_pairs = []
+            for category, tags in categories_data.items():
+                if tags:
+                    category_pairs.append(f"{category}: {', '.join(tags)}")
+            categories_display = "; ".join(category_pairs)
+        except json.JSONDecodeError:
+            categories_display = r.categories
+    return [
+        coder_name,
+        r.video_id,
+        result_status(r),
+        r.timestamp.isoformat() if r.timestamp else "",
+        r.notes or "",
+        categories_display
+    ]
+
+def _project_with_results(slug):
+    project = Project.query.filter_by(slug=slug).first()
+    if not project:
+        return None, (jsonify({"error": "Project not found"}), 404)
+    if not Result.query.filter_by(project_id=project.id).first():
+        return None, (jsonify({"error": "No results found"}), 404)
+    return project, None
+
+def generate_results_csv_gz(slug):
+    """Stream the results CSV gzip-compressed, one batch at a time"""
+    project, error = _project_with_results(slug)
+    if error:
+        return error
+    project_id = project.id
+
+    def generate():
+        buf = io.BytesIO()
+        text = io.StringIO()
+        writer = csv.writer(text)
+        with gzip.GzipFile(fileobj=buf, mode="wb") as gz:
+            writer.writerow(RESULT_CSV_HEADERS)
+            for i, (r, coder_name) in enumerate(iter_project_results(project_id), 1):
+                writer.writerow(_csv_row(r, coder_name))
+                if i % EXPORT_BATCH_SIZE == 0:
+                    gz.write(text.getvalue().encode("utf-8"))
+                    text.seek(0)
+                    text.truncate()
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            gz.write(text.getvalue().encode("utf-8"))
+        yield buf.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/gzip',
+        headers={
+            "Content-Disposition": f"attachment;filename={slug}_results.csv.gz"
+        }
+    )
+
+def generate_results_ndjson(slug):
+    """Stream results as newline-delimited JSON with structured categories"""
+    project, error = _project_with_results(slug)
+    if error:
+        return error
+    project_id = project.id
+
+    def generate():
+        for r, coder_name in iter_project_results(project_id):
+            yield json.dumps({
+                "coder": coder_name,
+                "video_id": r.video_id,
+                "status": result_status(r),
+                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+                "notes": r.notes or "",
+                "excluded": bool(r.excluded),
+                "categories": parse_result_categories(r)
+            }) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={
+            "Content-Disposition": f"attachment;filename={slug}_results.ndjson"
+        }
+    )
+
+def generate_results_parquet(slug):
+    """Export results as Parquet with one boolean column per codebook tag.
+
+    Row groups are written batch by batch to a spooled temp file, which is
+    then streamed back in chunks.
+    """
+    # Imported on demand: pyarrow is optional and slow to import
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return jsonify({"error": "Parquet export requires pyarrow"}), 501
+
+    project, error = _project_with_results(slug)
+    if error:
+        return error
+
+    # A tag listed twice in a category would otherwise produce duplicate column names
+    tag_pairs = list(dict.fromkeys(codebook_tags(get_codebook(project))))
+    tag_columns = [f"{cat}: {tag}" for cat, tag in tag_pairs]
+    schema = pa.schema(
+        [
+            ("coder", pa.string()),
+            ("video_id", pa.string()),
+            ("status", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+            ("notes", pa.string()),
+        ]
+        + [(col, pa.bool_()) for col in tag_columns]
+    )
+
+    def write_batch(writer, rows):
+        columns = {name: [row[name] for row in rows] for name in schema.names}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    spool = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    with pq.ParquetWriter(spool, schema, compression="snappy") as writer:
+        rows = []
+        for r, coder_name in iter_project_results(project.id):
+            categories = parse_result_categories(r)
+            row = {
+                "coder": coder_name,
+                "video_id": r.video_id,
+                "status": result_status(r),
+                "timestamp": r.timestamp,
+                "notes": r.notes or "",
+            }
+            for (cat, tag), col in zip(tag_pairs, tag_columns):
+                row[col] = tag in categories.get(cat, ())
+            rows.append(row)
+            if len(rows) >= EXPORT_BATCH_SIZE:
+                write_batch(writer, rows)
+                rows = []
+        if rows:
+            write_batch(writer, rows)
+    spool.seek(0)
+
+    def generate():
+        with spool:
+            while True:
+                chunk = spool.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+
+    return Response(
+        generate(),
+        mimetype='application/vnd.apache.parquet',
+        headers={
+            "Content-Disposition": f"attachment;filename={slug}_results.parquet"
+        }
+    )
+
 # Optional placeholder
 def load_project_csv(filepath):
     pass
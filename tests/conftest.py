@@ -0,0 +1,32 @@
+import pytest
+
+from app import create_app
+from extensions import db
+from routes import autosave, cache, codebook, manifest
+
+@pytest.fixture
+def app():
+    """An app on a fresh in-memory database"""
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "TESTING": True,
+        # Write autosaves through so tests see them without waiting for the flusher
+        "AUTOSAVE_COALESCE_WINDOW": 0,
+        # Tests poll the event log by hand instead of waiting for the relay thread
+        "EVENTS_POLL_INTERVAL": 3600
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    app.extensions["event_relay"].stop()
+    with app.app_context():
+        db.drop_all()
+    # Ids and parsed data are cached per process; don't leak them between databases
+    for lru in (cache.project_ids, cache.coder_ids, cache.codebooks,
+                codebook.compiled_codebooks, manifest.file_rows, manifest.video_lists):
+        lru.clear()
+    autosave.autosave_limiter.clear()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
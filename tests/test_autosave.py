@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from app import create_app
+from extensions import db
+from models import Project, Coder, Result
+from routes.autosave import Draft, DraftCoalescer, TokenBucket
+
+def draft(notes):
+    return Draft("proj", "alice", {}, notes, False, datetime.utcnow())
+
+def test_coalescer_keeps_latest_draft_per_key(app):
+    app.config["AUTOSAVE_COALESCE_WINDOW"] = 60
+    coalescer = DraftCoalescer(app)
+    key = (1, 1, "v1")
+    with app.app_context():
+        coalescer.put(key, draft("a"))
+        coalescer.put(key, draft("ab"))
+    assert coalescer.pending_count() == 1
+    assert coalescer.get(key).notes == "ab"
+    assert coalescer.take_due(window=60) == []
+    due = coalescer.take_due(window=0)
+    assert [(k, d.notes) for k, d in due] == [(key, "ab")]
+    coalescer.stop()
+
+def test_token_bucket_allows_burst_then_throttles():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() > 0
+
+def test_save_progress_is_rate_limited_per_coder(app, client):
+    app.config.update(AUTOSAVE_RATE=0.01, AUTOSAVE_BURST=2)
+    with app.app_context():
+        project = Project(slug="limits", name="Limits", codebook="[]")
+        db.session.add(project)
+        db.session.flush()
+        db.session.add_all([Coder(name="alice", project_id=project.id), Coder(name="bob", project_id=project.id)])
+        db.session.commit()
+
+    def save(coder):
+        return client.post("/api/save-progress", json={
+            "project": "limits", "coder": coder, "video_id": "v1", "response": {"notes": "x"}
+        })
+
+    assert [save("alice").status_code for _ in range(3)] == [200, 200, 429]
+    assert save("alice").headers["Retry-After"]
+    assert save("bob").status_code == 200
+
+def seed_coder(app, slug="race"):
+    with app.app_context():
+        project = Project(slug=slug, name=slug.title(), codebook="[]")
+        db.session.add(project)
+        db.session.flush()
+        coder = Coder(name="alice", project_id=project.id)
+        db.session.add(coder)
+        db.session.commit()
+        return project.id, coder.id
+
+def stored(app):
+    with app.app_context():
+        return db.session.query(Result.status, Result.notes).one()
+
+def test_late_draft_does_not_overwrite_submit(app, client):
+    project_id, coder_id = seed_coder(app)
+    key = (project_id, coder_id, "v1")
+    coalescer = DraftCoalescer(app)
+
+    # The flusher has taken the draft when submit runs, so submit finds nothing pending
+    late = Draft("race", "alice", {}, "draft", False, datetime.utcnow())
+    res = client.post("/api/submit", json={
+        "project": "race", "coder": "alice", "video_id": "v1", "categories": {"Tone": ["Casual"]}, "notes": "final"
+    })
+    assert res.status_code == 200
+    with app.app_context():
+        assert coalescer.flush([(key, late)]) == 0
+    assert stored(app) == ("submitted", "final")
+
+def test_older_draft_does_not_overwrite_newer_one(app):
+    project_id, coder_id = seed_coder(app)
+    key = (project_id, coder_id, "v1")
+    older = Draft("race", "alice", {}, "older", False, datetime(2024, 1, 1, 12, 0, 0))
+    newer = older._replace(notes="newer", saved_at=datetime(2024, 1, 1, 12, 0, 5))
+    coalescer = DraftCoalescer(app)
+    with app.app_context():
+        assert coalescer.flush([(key, newer)]) == 1
+        # e.g. another worker flushing its buffered draft afterwards
+        assert coalescer.flush([(key, older)]) == 0
+    assert stored(app) == ("draft", "newer")
+
+def test_autosave_after_submit_reopens_the_answer(app, client):
+    seed_coder(app)
+    client.post("/api/submit", json={
+        "project": "race", "coder": "alice", "video_id": "v1", "categories": {"Tone": ["Casual"]}, "notes": "first"
+    })
+    res = client.post("/api/save-progress", json={
+        "project": "race", "coder": "alice", "video_id": "v1", "response": {"notes": "edited later"}
+    })
+    assert res.status_code == 200
+    assert stored(app) == ("draft", "edited later")
+
+def test_drafts_are_flushed_into_their_own_apps_database(app):
+    other = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "AUTOSAVE_COALESCE_WINDOW": 60})
+    with other.app_context():
+        db.create_all()
+    seed_coder(app)
+    project_id, coder_id = seed_coder(other, "elsewhere")
+    with other.app_context():
+        other.extensions["autosaves"].put((project_id, coder_id, "v1"), draft("mine"))
+    assert app.extensions["autosaves"].pending_count() == 0
+
+    other.extensions["autosaves"].stop()
+    with app.app_context():
+        assert Result.query.count() == 0
+    with other.app_context():
+        assert db.session.query(Result.notes).scalar() == "mine"
@@ -0,0 +1,48 @@
+from routes.cache import LRUCache
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+def test_lru_expires_entries_after_ttl():
+    cache = LRUCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+def test_lru_pop_where():
+    cache = LRUCache()
+    cache.set((1, "alice"), 10)
+    cache.set((2, "bob"), 20)
+    cache.pop_where(lambda key: key[0] == 1)
+    assert cache.get((1, "alice")) is None
+    assert cache.get((2, "bob")) == 20
+
+def test_writes_ignore_ids_cached_before_another_worker_renamed_the_coder(app, client):
+    from extensions import db
+    from models import Coder, Result
+
+    client.post("/api/projects", json={"name": "Stale", "coders": ["alice"]})
+    assert client.get("/api/video-at-index?project=stale&coder=alice").status_code == 400  # no videos, ids cached
+
+    # Rename behind this process's back, as a request handled by another worker would
+    with app.app_context():
+        Coder.query.filter_by(name="alice").update({Coder.name: "alicia"})
+        db.session.commit()
+
+    def save(coder):
+        return client.post("/api/save-progress", json={
+            "project": "stale", "coder": coder, "video_id": "v1", "response": {"notes": "x"}
+        })
+
+    assert save("alice").status_code == 404
+    assert save("alicia").status_code == 200
+    with app.app_context():
+        assert Result.query.count() == 1
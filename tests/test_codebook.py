@@ -0,0 +1,112 @@
+import pytest
+
+from routes.codebook import (
+    apply_codebook_operations, apply_changes_to_categories, compile_codebook,
+    validate_categories, CodebookError
+)
+
+CODEBOOK = [
+    {"category": "Tone", "tags": [{"tag": "Humorous", "description": "Funny"}, "Serious"]},
+    {"category": "Style", "tags": ["Close-up"]},
+]
+
+def test_operations_apply_in_order_without_mutating_input():
+    codebook, changes = apply_codebook_operations(CODEBOOK, [
+        {"op": "add", "category": "Tone", "tag": "Casual"},
+        {"op": "rename", "category": "Tone", "tag": "Humorous", "new_name": "Funny"},
+        {"op": "remove", "category": "Style"},
+    ])
+    assert codebook == [
+        {"category": "Tone", "tags": [{"tag": "Funny", "description": "Funny"}, "Serious", "Casual"]},
+    ]
+    assert CODEBOOK[0]["tags"][0]["tag"] == "Humorous"
+
+    categories = apply_changes_to_categories(
+        {"Tone": ["Humorous", "Serious"], "Style": ["Close-up"]}, changes
+    )
+    assert categories == {"Tone": ["Funny", "Serious"]}
+
+def test_invalid_operation_is_rejected():
+    with pytest.raises(CodebookError):
+        apply_codebook_operations(CODEBOOK, [{"op": "rename", "category": "Missing", "new_name": "X"}])
+
+def test_non_object_operation_is_rejected(client):
+    with pytest.raises(CodebookError, match="Operation 1: must be an object"):
+        apply_codebook_operations(CODEBOOK, [{"op": "add", "category": "Tone"}, "remove"])
+    client.post("/api/projects", json={"name": "Versions", "codebook": CODEBOOK})
+    res = client.post("/api/codebook/bulk", json={"project": "versions", "version": 0, "operations": [None]})
+    assert res.status_code == 400
+
+def test_validate_categories_drops_unknown_entries():
+    compiled = compile_codebook(CODEBOOK)
+    clean, errors = validate_categories(compiled, {
+        "Tone": ["Serious", "Seriuos", "Serious"],
+        "Mood": ["Happy"],
+    })
+    assert clean == {"Tone": ["Serious"]}
+    assert errors == ["Unknown tag 'Seriuos' in 'Tone'", "Unknown category 'Mood'"]
+
+def test_bulk_update_rejects_stale_version(client):
+    client.post("/api/projects", json={"name": "Versions", "codebook": CODEBOOK})
+    assert client.get("/api/project-info?project=versions").get_json()["codebook_version"] == 0
+
+    first = client.post("/api/codebook/bulk", json={
+        "project": "versions", "version": 0,
+        "operations": [{"op": "add", "category": "Tone", "tag": "Casual"}]
+    })
+    assert first.get_json()["version"] == 1
+
+    stale = client.post("/api/codebook/bulk", json={
+        "project": "versions", "version": 0,
+        "operations": [{"op": "remove", "category": "Style"}]
+    })
+    assert stale.status_code == 409
+    assert stale.get_json()["version"] == 1
+    info = client.get("/api/project-info?project=versions").get_json()
+    assert [c["category"] for c in info["codebook"]] == ["Tone", "Style"]
+
+def test_project_update_validates_codebook_version(client):
+    client.post("/api/projects", json={"name": "Versions", "codebook": CODEBOOK})
+    res = client.put("/api/project/versions", json={"codebook": CODEBOOK, "codebook_version": "1"})
+    assert res.status_code == 400
+    res = client.put("/api/project/versions", json={"codebook": CODEBOOK, "codebook_version": True})
+    assert res.status_code == 400
+    res = client.put("/api/project/versions", json={"codebook": [], "codebook_version": 5})
+    assert res.status_code == 409
+    res = client.post("/api/codebook/bulk", json={"project": "versions", "version": False, "operations": []})
+    assert res.status_code == 400
+
+def test_unchanged_codebook_keeps_its_version(client):
+    client.post("/api/projects", json={"name": "Versions", "codebook": CODEBOOK})
+    assert client.put("/api/project/versions", json={"name": "Renamed"}).status_code == 200
+    assert client.put("/api/project/versions", json={"codebook": CODEBOOK, "codebook_version": 0}).status_code == 200
+    client.post("/api/codebook", json={"project": "versions", "category": "Style", "tag": "Close-up"})
+    info = client.get("/api/project-info?project=versions").get_json()
+    assert info["codebook_version"] == 0
+    assert info["codebook"] == CODEBOOK
+
+    client.put("/api/project/versions", json={"codebook": CODEBOOK[:1], "codebook_version": 0})
+    assert client.get("/api/project-info?project=versions").get_json()["codebook_version"] == 1
+
+def submit(client, categories, **extra):
+    return client.post("/api/submit", json={
+        "project": "checked", "coder": "alice", "video_id": "v1", "categories": categories, **extra
+    })
+
+def test_request_cannot_loosen_configured_validation(app, client):
+    client.post("/api/projects", json={"name": "Checked", "codebook": CODEBOOK, "coders": ["alice"]})
+    app.config["CODEBOOK_VALIDATION"] = "strict"
+    assert submit(client, {"Mood": ["Happy"]}, validation="off").status_code == 400
+
+    app.config["CODEBOOK_VALIDATION"] = "lenient"
+    assert submit(client, {"Tone": ["Serious", "Seriuos"]}, validation="strict").status_code == 400
+    res = submit(client, {"Tone": ["Serious", "Seriuos"]})
+    assert res.get_json()["dropped"] == ["Unknown tag 'Seriuos' in 'Tone'"]
+
+def test_lenient_submit_rejects_answer_with_no_valid_tags(app, client):
+    client.post("/api/projects", json={"name": "Checked", "codebook": CODEBOOK, "coders": ["alice"]})
+    app.config["CODEBOOK_VALIDATION"] = "lenient"
+    res = submit(client, {"Tone": ["Seriuos"], "Mood": ["Happy"]})
+    assert res.status_code == 400
+    assert len(res.get_json()["details"]) == 2
+    assert client.get("/api/results?project=checked").get_json()["results"] == []
@@ -0,0 +1,42 @@
+import gzip
+
+from flask import Response
+
+from app import choose_encoding
+
+def test_choose_encoding_honours_q_values():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+def add_routes(app):
+    app.add_url_rule("/big", "big", lambda: Response("x" * 4096, mimetype="text/plain"))
+    app.add_url_rule("/small", "small", lambda: Response("x" * 10, mimetype="text/plain"))
+    app.add_url_rule("/stream", "stream", lambda: Response((c for c in ["x" * 4096]), mimetype="text/plain"))
+
+def test_large_responses_are_gzipped(app):
+    add_routes(app)
+    client = app.test_client()
+    res = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert gzip.decompress(res.get_data()) == b"x" * 4096
+
+def test_small_refused_and_streamed_responses_are_left_alone(app):
+    add_routes(app)
+    client = app.test_client()
+
+    res = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in res.headers
+    assert "Accept-Encoding" in res.headers["Vary"]
+
+    res = client.get("/big", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in res.headers
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert res.get_data() == b"x" * 4096
+
+    res = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in res.headers
+    assert "Vary" not in res.headers
+    assert res.get_data() == b"x" * 4096
@@ -0,0 +1,80 @@
+from extensions import db
+from models import ProjectEvent
+from routes.events import Broadcaster
+import json
+
+def test_publish_fans_out_to_project_subscribers():
+    broadcaster = Broadcaster()
+    a = broadcaster.subscribe("proj")
+    b = broadcaster.subscribe("proj")
+    other = broadcaster.subscribe("other")
+    broadcaster.publish("proj", "progress", {"coder": "alice", "video_id": "1", "status": "draft"})
+    assert a.queue.get_nowait()[1] == "progress"
+    assert b.queue.get_nowait()[1] == "progress"
+    assert other.queue.empty()
+
+def test_full_subscriber_is_marked_lagged():
+    broadcaster = Broadcaster(maxsize=1)
+    sub = broadcaster.subscribe("proj")
+    broadcaster.publish("proj", "codebook", {})
+    broadcaster.publish("proj", "codebook", {})
+    assert sub.lagged
+    broadcaster.unsubscribe("proj", sub)
+    assert broadcaster.subscriber_count("proj") == 0
+
+def test_stream_delivers_progress_after_save(app, client):
+    client.post("/api/projects", json={"name": "Live", "coders": ["alice"]})
+    res = client.get("/api/projects/live/events", buffered=False)
+    assert res.status_code == 200
+    chunks = iter(res.response)
+    assert next(chunks).startswith(b"retry:")  # subscribed from here on
+
+    client.post("/api/save-progress", json={
+        "project": "live", "coder": "alice", "video_id": "v1", "response": {"notes": "x"}
+    })
+    with app.app_context():
+        assert app.extensions["event_relay"].poll() == 1
+    event = next(chunks).decode("utf-8")
+    assert "event: progress\n" in event
+    assert '"video_id": "v1"' in event and '"status": "draft"' in event
+    res.close()
+
+def test_stream_relays_events_logged_by_other_workers(app, client):
+    client.post("/api/projects", json={"name": "Live", "coders": ["alice"]})
+    res = client.get("/api/projects/live/events", buffered=False)
+    chunks = iter(res.response)
+    next(chunks)
+
+    with app.app_context():
+        # Another process writes to the same database
+        db.session.add(ProjectEvent(slug="live", event="codebook", data=json.dumps({"project": "live", "version": 3})))
+        db.session.commit()
+        event_id = db.session.query(db.func.max(ProjectEvent.id)).scalar()
+        app.extensions["event_relay"].poll()
+    event = next(chunks).decode("utf-8")
+    assert event.startswith(f"id: {event_id}\nevent: codebook\n")
+    assert '"version": 3' in event
+    res.close()
+
+def test_streams_are_capped_and_can_be_disabled(app, client):
+    client.post("/api/projects", json={"name": "Live", "coders": ["alice"]})
+    app.config["EVENTS_MAX_STREAMS"] = 1
+    first = client.get("/api/projects/live/events", buffered=False)
+    assert first.status_code == 200
+    assert client.get("/api/projects/live/events", buffered=False).status_code == 503
+    first.close()
+    second = client.get("/api/projects/live/events", buffered=False)
+    assert second.status_code == 200
+    second.close()
+
+    app.config["EVENTS_ENABLED"] = False
+    assert client.get("/api/projects/live/events").status_code == 503
+
+def test_disabled_events_are_not_logged(app, client):
+    client.post("/api/projects", json={"name": "Live", "coders": ["alice"]})
+    app.config["EVENTS_ENABLED"] = False
+    client.post("/api/save-progress", json={
+        "project": "live", "coder": "alice", "video_id": "v1", "response": {"notes": "x"}
+    })
+    with app.app_context():
+        assert ProjectEvent.query.count() == 0
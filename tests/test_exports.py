@@ -0,0 +1,70 @@
+import gzip
+import io
+import json
+import csv
+
+import pytest
+
+from extensions import db
+from models import Project, Coder, Result
+
+CODEBOOK = [
+    {"category": "Tone", "tags": ["Casual", "Serious", "Casual"]},
+    {"category": "Style", "tags": [{"tag": "Close-up"}]},
+]
+
+def seed(app):
+    with app.app_context():
+        project = Project(slug="exports", name="Exports", codebook=json.dumps(CODEBOOK))
+        db.session.add(project)
+        db.session.flush()
+        alice = Coder(name="alice", project_id=project.id)
+        bob = Coder(name="bob", project_id=project.id)
+        db.session.add_all([alice, bob])
+        db.session.flush()
+        db.session.add_all([
+            Result(project_id=project.id, coder_id=alice.id, video_id="v1",
+                   categories='{"Tone": ["Casual"], "Style": ["Close-up"]}', status="submitted"),
+            Result(project_id=project.id, coder_id=bob.id, video_id="v1",
+                   categories='{"Tone": ["Serious"]}', notes="hmm", status="draft"),
+            Result(project_id=project.id, coder_id=bob.id, video_id="v2",
+                   categories='{}', status="submitted", excluded=True),
+        ])
+        db.session.commit()
+
+def download(client, fmt):
+    res = client.get(f"/api/download-results?project=exports&format={fmt}")
+    assert res.status_code == 200
+    return res.get_data()
+
+def test_csv_formats_share_rows(app, client):
+    seed(app)
+    text = download(client, "text").decode("utf-8")
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == ["coder", "video_id", "status", "timestamp", "notes", "categories"]
+    assert [(r[0], r[1], r[2], r[5]) for r in rows[1:]] == [
+        ("alice", "v1", "submitted", "Tone: Casual; Style: Close-up"),
+        ("bob", "v1", "saved", "Tone: Serious"),
+        ("bob", "v2", "excluded", ""),
+    ]
+    assert download(client, "csv").decode("utf-8") == text
+    assert gzip.decompress(download(client, "csv.gz")).decode("utf-8") == text
+
+def test_ndjson_keeps_categories_structured(app, client):
+    seed(app)
+    lines = download(client, "ndjson").decode("utf-8").splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert len(rows) == 3
+    assert rows[0]["categories"] == {"Tone": ["Casual"], "Style": ["Close-up"]}
+    assert rows[2]["status"] == "excluded"
+    assert rows[2]["categories"] == {}
+
+def test_parquet_has_one_boolean_per_tag(app, client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    seed(app)
+    table = pq.read_table(io.BytesIO(download(client, "parquet")))
+    assert table.num_rows == 3
+    assert table.column_names[5:] == ["Tone: Casual", "Tone: Serious", "Style: Close-up"]
+    assert table.column("Tone: Casual").to_pylist() == [True, False, False]
+    assert table.column("Tone: Serious").to_pylist() == [False, True, False]
+    assert table.column("Style: Close-up").to_pylist() == [True, False, False]
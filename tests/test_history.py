@@ -0,0 +1,82 @@
+import json
+
+from models import Result, ResultRevision
+from routes.history import diff_categories, diff_notes, apply_delta
+
+def test_deltas_replay_to_the_new_answer():
+    old = ({"Tone": ["Casual", "Serious"], "Style": ["Close-up"]}, "first draft of notes")
+    new = ({"Tone": ["Serious", "Humorous"]}, "first full draft of notes")
+    added, removed = diff_categories(old[0], new[0])
+    delta = {"add": added, "remove": removed, "notes": diff_notes(old[1], new[1])}
+
+    assert delta["notes"] == [6, "", "full "]
+    categories, notes = apply_delta(*old, delta)
+    assert categories == new[0]
+    assert notes == new[1]
+
+def autosave(client, notes, coder="alice"):
+    return client.post("/api/save-progress", json={
+        "project": "hist", "coder": coder, "video_id": "v1", "response": {"notes": notes}
+    })
+
+def history(client):
+    return client.get("/api/result-history?project=hist&video_id=v1").get_json()["history"]
+
+def test_result_history_replays_each_revision(client):
+    client.post("/api/projects", json={"name": "Hist", "coders": ["alice"]})
+    autosave(client, "a")
+    autosave(client, "a")  # unchanged, not logged
+    client.post("/api/submit", json={
+        "project": "hist", "coder": "alice", "video_id": "v1", "categories": {"Tone": ["Casual"]}, "notes": "ab"
+    })
+    revisions = history(client)
+    assert [(r["status"], r["notes"], r["categories"]) for r in revisions] == [
+        ("draft", "a", {}),
+        ("submitted", "ab", {"Tone": ["Casual"]}),
+    ]
+    assert revisions[1]["delta"] == {"add": {"Tone": ["Casual"]}, "notes": [1, "", "b"]}
+    assert client.get("/api/result-history?project=hist").status_code == 400
+    assert client.get("/api/result-history?project=hist&coder=nobody").status_code == 404
+
+def test_autosaves_alone_are_pruned_into_a_base(app, client):
+    app.config["RESULT_HISTORY_LIMIT"] = 3
+    client.post("/api/projects", json={"name": "Hist", "coders": ["alice"]})
+    for i in range(1, 7):
+        autosave(client, "x" * i)
+
+    revisions = history(client)
+    assert [r["notes"] for r in revisions] == ["xxxx", "xxxxx", "xxxxxx"]
+    with app.app_context():
+        oldest = ResultRevision.query.order_by(ResultRevision.id).first()
+        assert json.loads(oldest.base) == {"categories": {}, "notes": "xxx"}
+
+def test_deleting_a_coder_deletes_their_history(app, client):
+    client.post("/api/projects", json={"name": "Hist", "coders": ["alice", "bob"]})
+    autosave(client, "a")
+    autosave(client, "b", coder="bob")
+    assert client.delete("/api/coder", json={"project": "hist", "coder": "alice"}).status_code == 200
+    assert [r["coder"] for r in history(client)] == ["bob"]
+
+    assert client.delete("/api/project/hist").status_code == 200
+    with app.app_context():
+        assert ResultRevision.query.count() == 0
+        assert Result.query.count() == 0
+
+def autosave_categories(client, categories):
+    return client.post("/api/save-progress", json={
+        "project": "hist", "coder": "alice", "video_id": "v1", "response": {"categories": categories}
+    })
+
+def test_history_stringifies_non_list_category_values(client):
+    # Projects without a codebook store categories unvalidated
+    client.post("/api/projects", json={"name": "Hist", "coders": ["alice"]})
+    assert autosave_categories(client, {"A": 1}).status_code == 200
+    assert autosave_categories(client, {"A": ["b", {"x": 1}]}).status_code == 200
+    assert [r["categories"] for r in history(client)] == [{"A": ["1"]}, {"A": ["b", '{"x": 1}']}]
+
+def test_history_treats_a_string_value_as_one_tag(client):
+    client.post("/api/projects", json={"name": "Hist", "coders": ["alice"]})
+    assert autosave_categories(client, {"A": "abc"}).status_code == 200
+    revision = history(client)[0]
+    assert revision["delta"] == {"add": {"A": ["abc"]}}
+    assert revision["categories"] == {"A": ["abc"]}
@@ -0,0 +1,95 @@
+import io
+import os
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Project, ProjectFile
+from routes import manifest
+
+@pytest.fixture
+def project(app, client, tmp_path, monkeypatch):
+    # Uploads are stored relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    client.post("/api/projects", json={"name": "Manifest", "coders": ["alice"]})
+    return "manifest"
+
+def upload(client, name, data):
+    return client.post("/api/upload-data", data={
+        "project": "manifest",
+        "file": (io.BytesIO(data), name)
+    }, content_type="multipart/form-data")
+
+def video_ids(client):
+    first = client.get("/api/video-at-index?project=manifest&index=0").get_json()
+    return [
+        client.get(f"/api/video-at-index?project=manifest&index={i}").get_json()["id"]
+        for i in range(first["total"])
+    ]
+
+def test_new_uploads_only_append(app, client, project):
+    upload(client, "first.csv", b"id,text\nv3,a\nv4,b\n")
+    assert video_ids(client) == ["v3", "v4"]
+
+    upload(client, "second.csv", b"id,text\nv1,c\nv4,dup\nv2,d\n")
+    assert video_ids(client) == ["v3", "v4", "v1", "v2"]
+
+    with app.app_context():
+        files = ProjectFile.query.order_by(ProjectFile.id).all()
+        assert [(f.row_offset, f.row_count) for f in files] == [(0, 2), (2, 2)]
+        assert all(f.checksum for f in files)
+        assert db.session.query(Project.video_count).scalar() == 4
+
+def test_changed_file_is_reread(app, client, project, tmp_path):
+    upload(client, "data.csv", b"id,text\nv1,a\n")
+    assert video_ids(client) == ["v1"]
+
+    (tmp_path / "uploads" / "manifest" / "Manifest.csv").write_bytes(b"id,text\nv1,a\nv2,b\nv3,c\n")
+    assert video_ids(client) == ["v1", "v2", "v3"]
+
+def test_non_csv_upload_does_not_break_project(client, project):
+    upload(client, "data.csv", b"id,text\nv1,a\n")
+    res = upload(client, "sheet.xlsx", b"PK\x03\x04\xff\xfe\x00binary")
+    assert res.status_code == 200
+    res = upload(client, "broken.csv", b"id,text\n\xff\xfe,bad\n")
+    assert res.status_code == 200
+
+    assert video_ids(client) == ["v1"]
+    assert client.get("/api/projects").status_code == 200
+
+def test_cold_lookup_reads_only_the_file_holding_the_index(app, client, project, tmp_path, monkeypatch):
+    upload(client, "first.csv", b"id,text\nv1,a\nv2,b\n")
+    upload(client, "second.csv", b"id,text\nv2,dup\nv3,c\nv4,d\n")
+
+    # A freshly forked or restarted worker has nothing cached
+    manifest.file_rows.clear()
+    manifest.video_lists.clear()
+    parsed = []
+    parse_file = manifest.parse_file
+    monkeypatch.setattr(manifest, "parse_file", lambda pf, path: parsed.append(pf.filename) or parse_file(pf, path))
+    monkeypatch.setattr(manifest, "file_checksum", lambda path: pytest.fail("unchanged file re-hashed"))
+
+    res = client.get("/api/video-at-index?project=manifest&index=3").get_json()
+    assert (res["id"], res["total"]) == ("v4", 4)
+    assert parsed == ["Manifest_1.csv"]
+
+def test_touched_file_is_rehashed_but_not_reingested(app, client, project, tmp_path):
+    upload(client, "data.csv", b"id,text\nv1,a\n")
+    path = tmp_path / "uploads" / "manifest" / "Manifest.csv"
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    manifest.file_rows.clear()
+    assert video_ids(client) == ["v1"]
+    with app.app_context():
+        pf = ProjectFile.query.one()
+        assert pf.file_mtime_ns == stat.st_mtime_ns + 10**9
+
+def test_file_can_only_be_registered_once(app, client, project):
+    upload(client, "data.csv", b"id,text\nv1,a\n")
+    with app.app_context():
+        pf = ProjectFile.query.one()
+        db.session.add(ProjectFile(project_id=pf.project_id, filename=pf.filename, original_name="again.csv"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
@@ -0,0 +1,41 @@
+from extensions import db
+from models import Project, Coder, Result
+
+def seed(app):
+    with app.app_context():
+        project = Project(slug="paging", name="Paging", codebook="[]")
+        db.session.add(project)
+        db.session.flush()
+        alice = Coder(name="alice", project_id=project.id)
+        bob = Coder(name="bob", project_id=project.id)
+        db.session.add_all([alice, bob])
+        db.session.flush()
+        for i in range(5):
+            db.session.add(Result(
+                project_id=project.id, coder_id=alice.id if i % 2 == 0 else bob.id,
+                video_id=f"v{i}", categories='{"Tone": ["Casual"]}', notes=f"note {i}",
+                status="submitted" if i < 4 else "draft"
+            ))
+        db.session.commit()
+
+def test_results_page_by_cursor(app, client):
+    seed(app)
+    seen = []
+    after_id = 0
+    while after_id is not None:
+        res = client.get(f"/api/results?project=paging&limit=2&after_id={after_id}")
+        body = res.get_json()
+        seen.extend(r["video_id"] for r in body["results"])
+        after_id = body["next_after_id"]
+    assert seen == ["v0", "v1", "v2", "v3", "v4"]
+
+def test_results_filter_and_project_fields(app, client):
+    seed(app)
+    res = client.get("/api/results?project=paging&coder=alice&status=submitted&fields=video_id,categories")
+    body = res.get_json()
+    assert body["results"] == [
+        {"video_id": "v0", "categories": {"Tone": ["Casual"]}},
+        {"video_id": "v2", "categories": {"Tone": ["Casual"]}},
+    ]
+    assert body["next_after_id"] is None
+    assert client.get("/api/results?project=paging&fields=secret").status_code == 400
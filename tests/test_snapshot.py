@@ -0,0 +1,97 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+@pytest.fixture
+def project(client, tmp_path, monkeypatch):
+    # Uploads are stored relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    client.post("/api/projects", json={
+        "name": "Source", "coders": ["alice", "bob"],
+        "codebook": [{"category": "Tone", "tags": ["Casual", "Serious"]}]
+    })
+    client.post("/api/upload-data", data={
+        "project": "source", "file": (io.BytesIO(b"id,text\nv1,a\nv2,b\n"), "videos.csv")
+    }, content_type="multipart/form-data")
+    client.post("/api/submit", json={
+        "project": "source", "coder": "alice", "video_id": "v1", "categories": {"Tone": ["Casual"]}, "notes": "hi"
+    })
+    client.post("/api/save-progress", json={
+        "project": "source", "coder": "bob", "video_id": "v2", "response": {"categories": {"Tone": ["Serious"]}}
+    })
+    return "source"
+
+def snapshot(client):
+    res = client.get("/api/project/source/snapshot")
+    assert res.status_code == 200
+    return res.get_data()
+
+def restore(client, data, **form):
+    return client.post("/api/projects/restore", data={
+        "file": (io.BytesIO(data), "snapshot.zip"), **form
+    }, content_type="multipart/form-data")
+
+def rewrite(data, name, content):
+    """Return a copy of a snapshot zip with one entry replaced"""
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(out, "w") as dst:
+        for item in src.infolist():
+            dst.writestr(item, content if item.filename == name else src.read(item))
+    return out.getvalue()
+
+def results(client, slug):
+    res = client.get(f"/api/results?project={slug}&fields=coder,video_id,status,notes,categories")
+    return res.get_json()["results"]
+
+def test_snapshot_restores_under_new_slug(client, project, tmp_path):
+    res = restore(client, snapshot(client), slug="copy", name="Copy")
+    assert res.status_code == 200
+    assert res.get_json()["results"] == 2
+
+    info = client.get("/api/project-info?project=copy").get_json()
+    assert info["name"] == "Copy"
+    assert info["coders"] == ["alice", "bob"]
+    assert results(client, "copy") == results(client, "source")
+    assert (tmp_path / "uploads" / "copy" / "Source.csv").read_bytes() == b"id,text\nv1,a\nv2,b\n"
+    assert client.get("/api/video-at-index?project=copy&index=1").get_json()["id"] == "v2"
+
+def history(client, slug):
+    res = client.get(f"/api/result-history?project={slug}&video_id=v1")
+    return [{k: v for k, v in h.items() if k != "id"} for h in res.get_json()["history"]]
+
+def test_snapshot_restores_result_history(client, project):
+    client.post("/api/save-progress", json={
+        "project": "source", "coder": "alice", "video_id": "v1", "response": {"notes": "hi there"}
+    })
+    res = restore(client, snapshot(client), slug="copy")
+    assert res.get_json()["revisions"] == 3
+    assert len(history(client, "source")) == 2
+    assert history(client, "copy") == history(client, "source")
+
+def test_snapshot_without_revisions_still_restores(client, project):
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(snapshot(client))) as src, zipfile.ZipFile(out, "w") as dst:
+        for item in src.infolist():
+            if item.filename != "revisions.ndjson":
+                dst.writestr(item, src.read(item))
+    res = restore(client, out.getvalue(), slug="old")
+    assert res.status_code == 200
+    assert res.get_json()["revisions"] == 0
+    assert res.get_json()["results"] == 2
+
+def test_restore_rejects_bad_archives_and_existing_slug(client, project):
+    data = snapshot(client)
+    assert restore(client, b"not a zip").status_code == 400
+    assert restore(client, data).status_code == 409
+
+    coders = json.dumps([{"name": "alice"}, {"name": "alice"}])
+    assert restore(client, rewrite(data, "coders.json", coders), slug="dupes").status_code == 400
+
+def test_restore_with_unknown_coder_rolls_back(client, project, tmp_path):
+    line = json.dumps({"coder": "mallory", "video_id": "v1", "categories": {}, "status": "draft"})
+    res = restore(client, rewrite(snapshot(client), "results.ndjson", line + "\n"), slug="broken")
+    assert res.status_code == 400
+    assert client.get("/api/project-info?project=broken").status_code == 404
+    assert not (tmp_path / "uploads" / "broken").exists()
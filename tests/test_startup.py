@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+def test_models_import_without_the_app():
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, models; print('app' in sys.modules, 'routes' in sys.modules)"],
+        capture_output=True, text=True, check=True
+    )
+    assert out.stdout.split() == ["False", "False"]
+
+def test_create_app_serves_first_request(client):
+    res = client.post("/api/projects", json={"name": "Startup Check", "coders": ["alice"]})
+    assert res.status_code == 200
+    res = client.get("/api/project-info?project=startup-check")
+    assert res.get_json()["coders"] == ["alice"]
@@ -0,0 +1,40 @@
+"""Production WSGI entry point.
+
+Run with gunicorn using the bundled config:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app enabled this module is imported once in the master process,
+so the caches warmed here are shared copy-on-write by every worker. Entries
+still expire on their TTL, after which each worker re-fills its own copy.
+"""
+import gc
+
+from app import create_app
+from extensions import db
+from models import Project, Coder, upgrade_schema
+from routes.cache import project_ids, coder_ids
+from routes.manifest import load_video_list
+
+app = create_app()
+
+with app.app_context():
+    # Add tables and columns introduced since the database was created
+    upgrade_schema()
+
+def warm_caches():
+    """Resolve every project and coder id and load every project's video list"""
+    with app.app_context():
+        for project in Project.query.all():
+            project_ids.set(project.slug, project.id)
+            for coder_id, name in db.session.query(Coder.id, Coder.name).filter_by(project_id=project.id):
+                coder_ids.set((project.id, name), coder_id)
+            load_video_list(project)
+        # Connections must not be shared across fork; workers open their own
+        db.session.remove()
+        db.engine.dispose()
+
+warm_caches()
+# Move everything allocated so far out of the GC's tracked generations so
+# collections in the workers don't touch (and un-share) those pages
+gc.freeze()